@@ -0,0 +1,124 @@
+"""
+Concurrency benchmark for the client's model calls against a local fake Bedrock endpoint.
+
+Runs batches of concurrent model calls on one event loop, as concurrent /query
+requests do, with the blocking AnthropicBedrock client and with the shared
+AsyncAnthropicBedrock client used by client.py.
+
+    python benchmark_bedrock.py --latency 0.5 --concurrency 1 4 16 64
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from anthropic import AnthropicBedrock, AsyncAnthropicBedrock, DefaultAsyncHttpxClient
+
+MODEL_ID = "us.anthropic.claude-3-5-sonnet-20241022-v2:0"
+# requests are signed, so credentials are needed even for a fake endpoint
+CLIENT_ARGS = {"aws_region": "us-east-1", "aws_access_key": "fake", "aws_secret_key": "fake"}
+
+
+def make_handler(latency):
+    class FakeBedrockHandler(BaseHTTPRequestHandler):
+        """Answers POST /model/{modelId}/invoke after a fixed delay"""
+
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latency)
+            body = json.dumps({
+                "id": "msg_fake",
+                "type": "message",
+                "role": "assistant",
+                "model": MODEL_ID,
+                "content": [{"type": "text", "text": "Hello!"}],
+                "stop_reason": "end_turn",
+                "stop_sequence": None,
+                "usage": {"input_tokens": 10, "output_tokens": 2},
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeBedrockHandler
+
+
+async def run_blocking(client, requests, concurrency):
+    async def query():
+        # what process_query did before: the whole call runs on, and blocks, the event loop
+        client.messages.create(model=MODEL_ID, max_tokens=100, messages=[{"role": "user", "content": "Hi"}])
+
+    await run_batches(query, requests, concurrency)
+
+
+async def run_async(client, requests, concurrency):
+    async def query():
+        await client.messages.create(model=MODEL_ID, max_tokens=100, messages=[{"role": "user", "content": "Hi"}])
+
+    await run_batches(query, requests, concurrency)
+
+
+async def run_batches(query, requests, concurrency):
+    slots = asyncio.Semaphore(concurrency)
+
+    async def limited():
+        async with slots:
+            await query()
+
+    await asyncio.gather(*(limited() for _ in range(requests)))
+
+
+async def measure(base_url, requests, concurrency):
+    results = {}
+
+    client = AnthropicBedrock(base_url=base_url, **CLIENT_ARGS)
+    start = time.perf_counter()
+    await run_blocking(client, requests, concurrency)
+    results["blocking"] = requests / (time.perf_counter() - start)
+    client.close()
+
+    client = AsyncAnthropicBedrock(
+        base_url=base_url,
+        http_client=DefaultAsyncHttpxClient(limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)),
+        **CLIENT_ARGS,
+    )
+    start = time.perf_counter()
+    await run_async(client, requests, concurrency)
+    results["async"] = requests / (time.perf_counter() - start)
+    await client.close()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake model latency in seconds")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests-per-slot", type=int, default=4, help="Requests sent per unit of concurrency")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print(f"{args.latency}s fake model latency")
+    for concurrency in args.concurrency:
+        requests = concurrency * args.requests_per_slot
+        results = asyncio.run(measure(base_url, requests, concurrency))
+        print(f"  concurrency={concurrency:<4} blocking {results['blocking']:7.1f} req/s   async {results['async']:7.1f} req/s")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
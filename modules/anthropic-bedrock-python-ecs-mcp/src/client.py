@@ -1,60 +1,291 @@
 from typing import Optional
-from contextlib import AsyncExitStack
+from collections import deque
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import timedelta
+import asyncio
+import json
+import time
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 import uvicorn
 
-from mcp import ClientSession
+from mcp import ClientSession, types
 from mcp.client.sse import sse_client
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared.exceptions import McpError
 
-from anthropic import AnthropicBedrock
+import httpx
+from anthropic import AsyncAnthropicBedrock, DefaultAsyncHttpxClient
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 SERVER_URL = os.getenv("SERVER_URL", "http://0.0.0.0:8080")
+MAX_CONCURRENT_QUERIES = int(os.getenv("MAX_CONCURRENT_QUERIES", "16"))
+MAX_QUEUED_QUERIES = int(os.getenv("MAX_QUEUED_QUERIES", "64"))
+QUERY_TIMEOUT = float(os.getenv("QUERY_TIMEOUT", "60"))
+BEDROCK_MAX_CONNECTIONS = int(os.getenv("BEDROCK_MAX_CONNECTIONS", "64"))
+TOOLS_TTL = float(os.getenv("TOOLS_TTL", "300"))
+MAX_TOOL_ROUNDS = int(os.getenv("MAX_TOOL_ROUNDS", "10"))
+# "sse", or "streamable-http" for a server started with --transport streamable-http
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "sse")
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "4"))
+MCP_CALL_TIMEOUT = float(os.getenv("MCP_CALL_TIMEOUT", "30"))
+MCP_PROBE_INTERVAL = float(os.getenv("MCP_PROBE_INTERVAL", "15"))
+MCP_RECONNECT_MAX_DELAY = float(os.getenv("MCP_RECONNECT_MAX_DELAY", "30"))
+MODEL_ID = "us.anthropic.claude-3-5-sonnet-20241022-v2:0"
 app = FastAPI()
 
 
 class Query(BaseModel):
     text: str
+    # seconds until the query is abandoned, capped at QUERY_TIMEOUT
+    timeout: Optional[float] = None
+
+
+class AdmissionController:
+    """Limits how many queries run at once and how many may wait for a slot"""
+
+    def __init__(self, max_concurrent: int, max_queued: int):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self.running = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.queue_times = deque(maxlen=1000)
+
+    @asynccontextmanager
+    async def admit(self, deadline: float):
+        """Wait for a slot until the deadline, rejecting at once when the queue is full"""
+        if self.queued >= self.max_queued:
+            self.rejected += 1
+            raise HTTPException(status_code=429, detail="Too many queued queries", headers={"Retry-After": "1"})
+
+        start = time.monotonic()
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=max(deadline - start, 0))
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise HTTPException(status_code=503, detail="Timed out waiting for a free slot", headers={"Retry-After": "1"})
+        finally:
+            self.queued -= 1
+
+        self.queue_times.append(time.monotonic() - start)
+        self.admitted += 1
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self._slots.release()
+
+    def metrics(self) -> dict:
+        """Current load and queue times (in seconds) of the most recent queries"""
+        queue_times = sorted(self.queue_times)
+
+        def percentile(p):
+            return queue_times[min(int(len(queue_times) * p), len(queue_times) - 1)] if queue_times else 0.0
+
+        return {
+            "running": self.running,
+            "queued": self.queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "queue_time_p50": percentile(0.5),
+            "queue_time_p95": percentile(0.95),
+            "queue_time_max": queue_times[-1] if queue_times else 0.0,
+        }
+
+
+class SSESession:
+    """One connection to the MCP server, reopened with exponential backoff whenever it is lost
+
+    The connection is owned by its own task, because the transport streams and the
+    session must be entered and exited in the same task. It uses SSE unless
+    MCP_TRANSPORT is streamable-http."""
+
+    def __init__(self, server_url: str, message_handler):
+        self.server_url = server_url
+        self.message_handler = message_handler
+        self.session: Optional[ClientSession] = None
+        self.in_flight = 0
+        self.connects = 0
+        self.connected = asyncio.Event()
+        self._lost = asyncio.Event()
+        self._closing = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def mark_lost(self):
+        """Drop the connection; it is reopened after the backoff delay"""
+        self._lost.set()
+
+    async def close(self):
+        # cancelled rather than signalled: the task may be sleeping out a backoff or stuck in initialize()
+        self._closing = True
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        delay = 1.0
+        while not self._closing:
+            try:
+                async with self._open_streams() as streams:
+                    async with ClientSession(
+                        streams[0],
+                        streams[1],
+                        read_timeout_seconds=timedelta(seconds=MCP_CALL_TIMEOUT),
+                        message_handler=self._handle_message,
+                    ) as session:
+                        await session.initialize()
+                        self.session = session
+                        self.connects += 1
+                        self.connected.set()
+                        delay = 1.0
+                        await self._lost.wait()
+            except Exception as e:
+                print(f"MCP session to {self.server_url} failed: {e}")
+            finally:
+                self.session = None
+                self.connected.clear()
+                self._lost.clear()
+            if not self._closing:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MCP_RECONNECT_MAX_DELAY)
+
+    def _open_streams(self):
+        if MCP_TRANSPORT == "streamable-http":
+            return streamablehttp_client(f"{self.server_url}/mcp/")
+        return sse_client(url=f"{self.server_url}/sse")
+
+    async def _handle_message(self, message):
+        if isinstance(message, Exception):
+            # the SSE stream broke; requests on this session would only time out
+            self.mark_lost()
+        else:
+            await self.message_handler(message)
+
+
+class SSESessionPool:
+    """A fixed number of SSE sessions, each call going to the connected session with the fewest calls in flight
+
+    Every session is a separate connection, so behind a load balancer the sessions
+    spread over the server's tasks. Idle connections are probed with pings, and
+    sessions whose calls time out or fail are reconnected."""
+
+    def __init__(self, server_url: str, size: int, message_handler):
+        self.sessions = [SSESession(server_url, message_handler) for _ in range(size)]
+        self._prober: Optional[asyncio.Task] = None
+
+    async def start(self, timeout: Optional[float] = None):
+        """Open every session and wait until at least one is connected"""
+        for session in self.sessions:
+            session.start()
+        self._prober = asyncio.create_task(self._probe())
+        await self._wait_for_connection(timeout)
+
+    async def close(self):
+        if self._prober:
+            self._prober.cancel()
+        await asyncio.gather(*(session.close() for session in self.sessions))
+
+    @asynccontextmanager
+    async def session(self, timeout: Optional[float] = None):
+        """Borrow the least busy connected session for one or more calls"""
+        connected = [session for session in self.sessions if session.session is not None]
+        if not connected:
+            await self._wait_for_connection(timeout)
+            connected = [session for session in self.sessions if session.session is not None]
+        pooled = min(connected, key=lambda session: session.in_flight)
+
+        pooled.in_flight += 1
+        try:
+            yield pooled.session
+        except McpError as e:
+            # other MCP errors are answers from a working session
+            if e.error.code == httpx.codes.REQUEST_TIMEOUT:
+                pooled.mark_lost()
+            raise
+        except Exception:
+            pooled.mark_lost()
+            raise
+        finally:
+            pooled.in_flight -= 1
+
+    def stats(self) -> list[dict]:
+        return [
+            {"connected": session.session is not None, "in_flight": session.in_flight, "connects": session.connects}
+            for session in self.sessions
+        ]
+
+    async def _wait_for_connection(self, timeout: Optional[float]):
+        timeout = MCP_CALL_TIMEOUT if timeout is None else timeout
+        waiters = [asyncio.create_task(session.connected.wait()) for session in self.sessions]
+        try:
+            done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+        if not done:
+            raise ConnectionError(f"No MCP session connected within {timeout}s")
+
+    async def _probe(self):
+        while True:
+            await asyncio.sleep(MCP_PROBE_INTERVAL)
+            await asyncio.gather(*(self._ping(session) for session in self.sessions if session.session is not None and session.in_flight == 0))
+
+    async def _ping(self, pooled: SSESession):
+        try:
+            await asyncio.wait_for(pooled.session.send_ping(), timeout=MCP_CALL_TIMEOUT)
+        except Exception as e:
+            print(f"MCP session health check failed, reconnecting: {e}")
+            pooled.mark_lost()
 
 
 class MCPClient:
     def __init__(self):
-        self.session: Optional[ClientSession] = None
-        self.exit_stack = AsyncExitStack()
-        self.anthropic = AnthropicBedrock()
+        self.pool: Optional[SSESessionPool] = None
+        # Anthropic tool definitions, listed at startup and refreshed on tools/list_changed or after TOOLS_TTL
+        self.tools: list[dict] = []
+        self.tools_listed_at: Optional[float] = None
+        self._tools_refresh: Optional[asyncio.Task] = None
+        # one non-blocking client, and so one pool of keep-alive connections, shared by all queries
+        self.anthropic = AsyncAnthropicBedrock(
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_connections=BEDROCK_MAX_CONNECTIONS, max_keepalive_connections=BEDROCK_MAX_CONNECTIONS)
+            )
+        )
 
     async def connect_to_sse_server(self, server_url: str):
-        """Connect to an MCP server running with SSE transport"""
-        self._streams_context = sse_client(url=f"{server_url}/sse")
-        streams = await self._streams_context.__aenter__()
-
-        self._session_context = ClientSession(*streams)
-        self.session: ClientSession = await self._session_context.__aenter__()
-
-        await self.session.initialize()
+        """Connect a pool of sessions to an MCP server running with SSE transport"""
+        self.pool = SSESessionPool(server_url, MCP_POOL_SIZE, self._handle_message)
+        await self.pool.start()
 
         print("Initialized SSE client...")
         print("Listing tools...")
-        response = await self.session.list_tools()
-        tools = response.tools
-        print("\nConnected to server with tools:", [tool.name for tool in tools])
-
-    async def cleanup(self):
-        """Properly clean up the session and streams"""
-        if self._session_context:
-            await self._session_context.__aexit__(None, None, None)
-        if self._streams_context:
-            await self._streams_context.__aexit__(None, None, None)
-
-    async def process_query(self, query: str) -> str:
-        """Process a query using Claude and available tools"""
-        messages = [{"role": "user", "content": query}]
-
-        response = await self.session.list_tools()
-        available_tools = [
+        await self.refresh_tools()
+        print("\nConnected to server with tools:", [tool["name"] for tool in self.tools])
+
+    async def refresh_tools(self):
+        """List the server's tools and convert them to Anthropic tool definitions"""
+        async with self.pool.session() as session:
+            response = await session.list_tools()
+        self.tools = [
             {
                 "name": tool.name,
                 "description": tool.description,
@@ -62,45 +293,135 @@ class MCPClient:
             }
             for tool in response.tools
         ]
+        self.tools_listed_at = time.monotonic()
+
+    async def get_tools(self) -> list[dict]:
+        """The cached tool definitions; once they are older than TOOLS_TTL they are still used while a refresh runs in the background"""
+        if self.tools_listed_at is None:
+            await self.refresh_tools()
+        elif time.monotonic() - self.tools_listed_at > TOOLS_TTL:
+            self._schedule_tools_refresh()
+        return self.tools
+
+    def tools_cache_age(self) -> Optional[float]:
+        """Seconds since the tools were last listed"""
+        return None if self.tools_listed_at is None else time.monotonic() - self.tools_listed_at
+
+    def _schedule_tools_refresh(self):
+        if self._tools_refresh is None or self._tools_refresh.done():
+            self._tools_refresh = asyncio.create_task(self._refresh_tools_in_background())
+
+    async def _refresh_tools_in_background(self):
+        try:
+            await self.refresh_tools()
+        except Exception as e:
+            print(f"Error refreshing tools: {e}")
+
+    async def _handle_message(self, message):
+        # runs in the session's receive loop, which must not wait on a request of its own
+        if isinstance(message, types.ServerNotification) and isinstance(message.root, types.ToolListChangedNotification):
+            self._schedule_tools_refresh()
 
-        response = self.anthropic.messages.create(
-            model="us.anthropic.claude-3-5-sonnet-20241022-v2:0",
-            max_tokens=1000,
-            messages=messages,
-            tools=available_tools,
-        )
-
-        tool_results = []
-        final_text = []
-
-        for content in response.content:
-            if content.type == "text":
-                final_text.append(content.text)
-            elif content.type == "tool_use":
-                tool_name = content.name
-                tool_args = content.input
-
-                result = await self.session.call_tool(tool_name, tool_args)
-                tool_results.append({"call": tool_name, "result": result})
-                final_text.append(f"[Calling tool {tool_name} with args {tool_args}]")
+    async def cleanup(self):
+        """Properly clean up the session and streams"""
+        if self._tools_refresh:
+            self._tools_refresh.cancel()
+        if self.pool:
+            await self.pool.close()
+        await self.anthropic.close()
 
-                if hasattr(content, "text") and content.text:
-                    messages.append({"role": "assistant", "content": content.text})
-                messages.append({"role": "user", "content": result.content})
+    async def process_query(self, query: str) -> str:
+        """Process a query using Claude and available tools"""
+        messages = [{"role": "user", "content": query}]
 
-                response = self.anthropic.messages.create(
-                    model="us.anthropic.claude-3-5-sonnet-20241022-v2:0",
-                    max_tokens=1000,
-                    messages=messages,
-                )
+        available_tools = await self.get_tools()
 
-                final_text.append(response.content[0].text)
+        final_text = []
 
+        for _ in range(MAX_TOOL_ROUNDS):
+            response = await self.anthropic.messages.create(
+                model=MODEL_ID,
+                max_tokens=1000,
+                messages=messages,
+                tools=available_tools,
+            )
+
+            tool_uses = []
+            for content in response.content:
+                if content.type == "text":
+                    final_text.append(content.text)
+                elif content.type == "tool_use":
+                    tool_uses.append(content)
+                    final_text.append(f"[Calling tool {content.name} with args {content.input}]")
+
+            if response.stop_reason != "tool_use" or not tool_uses:
+                return "\n".join(final_text)
+
+            # run every tool call of the round at once and answer them all in one follow-up call
+            messages.append({"role": "assistant", "content": response.content})
+            tool_results = await asyncio.gather(*(self.call_tool(tool_use) for tool_use in tool_uses))
+            messages.append({"role": "user", "content": list(tool_results)})
+
+        final_text.append(f"[Stopped after {MAX_TOOL_ROUNDS} rounds of tool use]")
         return "\n".join(final_text)
 
+    async def stream_query(self, query: str):
+        """Process a query like process_query, yielding model text deltas and tool call progress as events"""
+        messages = [{"role": "user", "content": query}]
+        available_tools = await self.get_tools()
+
+        for _ in range(MAX_TOOL_ROUNDS):
+            async with self.anthropic.messages.stream(
+                model=MODEL_ID,
+                max_tokens=1000,
+                messages=messages,
+                tools=available_tools,
+            ) as stream:
+                async for event in stream:
+                    if event.type == "content_block_delta" and event.delta.type == "text_delta":
+                        yield {"type": "text", "text": event.delta.text}
+                response = await stream.get_final_message()
+
+            tool_uses = [content for content in response.content if content.type == "tool_use"]
+            if response.stop_reason != "tool_use" or not tool_uses:
+                yield {"type": "done"}
+                return
+
+            messages.append({"role": "assistant", "content": response.content})
+            for tool_use in tool_uses:
+                yield {"type": "tool_call", "id": tool_use.id, "name": tool_use.name, "input": tool_use.input}
+            tasks = [asyncio.create_task(self.call_tool(tool_use)) for tool_use in tool_uses]
+            try:
+                for completed in asyncio.as_completed(tasks):
+                    tool_result = await completed
+                    yield {"type": "tool_result", "id": tool_result["tool_use_id"], "is_error": tool_result["is_error"]}
+            finally:
+                # the consumer may stop early, e.g. when the client disconnects
+                for task in tasks:
+                    task.cancel()
+            messages.append({"role": "user", "content": [task.result() for task in tasks]})
+
+        yield {"type": "done", "detail": f"Stopped after {MAX_TOOL_ROUNDS} rounds of tool use"}
+
+    async def call_tool(self, tool_use) -> dict:
+        """Call the MCP tool requested by a tool_use block and return the matching tool_result block"""
+        try:
+            async with self.pool.session() as session:
+                result = await session.call_tool(tool_use.name, tool_use.input)
+        except Exception as e:
+            return {"type": "tool_result", "tool_use_id": tool_use.id, "content": f"Error calling tool: {e}", "is_error": True}
+
+        return {
+            "type": "tool_result",
+            "tool_use_id": tool_use.id,
+            "content": [{"type": "text", "text": content.text} for content in result.content if content.type == "text"],
+            "is_error": result.isError,
+        }
+
 
 # Create a global MCPClient instance
 mcp_client = MCPClient()
+admission = AdmissionController(MAX_CONCURRENT_QUERIES, MAX_QUEUED_QUERIES)
 
 
 @app.on_event("startup")
@@ -118,17 +439,73 @@ async def shutdown_event():
 @app.post("/query")
 async def process_query(query: Query):
     """Handle POST requests with queries"""
-    try:
-        response = await mcp_client.process_query(query.text)
-        return {"response": response}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    timeout = min(query.timeout, QUERY_TIMEOUT) if query.timeout else QUERY_TIMEOUT
+    deadline = time.monotonic() + timeout
+    async with admission.admit(deadline):
+        try:
+            response = await asyncio.wait_for(mcp_client.process_query(query.text), timeout=deadline - time.monotonic())
+            return {"response": response}
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Query deadline exceeded")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+
+def sse_event(event: dict) -> str:
+    return f"data: {json.dumps(event)}\n\n"
+
+
+@app.post("/query/stream")
+async def stream_query(query: Query):
+    """Handle POST requests with queries, streaming progress as server-sent events"""
+    timeout = min(query.timeout, QUERY_TIMEOUT) if query.timeout else QUERY_TIMEOUT
+    deadline = time.monotonic() + timeout
+    # admit before the response starts, so rejected queries still get a plain 429/503
+    admitted = AsyncExitStack()
+    await admitted.enter_async_context(admission.admit(deadline))
+
+    async def events():
+        queue = asyncio.Queue()
+
+        async def produce():
+            try:
+                async for event in mcp_client.stream_query(query.text):
+                    await queue.put(event)
+            except Exception as e:
+                await queue.put({"type": "error", "detail": str(e)})
+            finally:
+                await queue.put(None)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while (event := await asyncio.wait_for(queue.get(), timeout=deadline - time.monotonic())) is not None:
+                yield sse_event(event)
+        except asyncio.TimeoutError:
+            yield sse_event({"type": "error", "detail": "Query deadline exceeded"})
+        finally:
+            # also reached when the client disconnects and starlette cancels the response,
+            # so abandoned queries stop their model stream and tool calls
+            producer.cancel()
+            await admitted.aclose()
+
+    # the background task releases the slot if the response is cancelled before events() starts
+    return StreamingResponse(events(), media_type="text/event-stream", background=BackgroundTask(admitted.aclose))
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "tools_cache_age": mcp_client.tools_cache_age(),
+        "mcp_sessions": mcp_client.pool.stats() if mcp_client.pool else [],
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Admission control metrics"""
+    return admission.metrics()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,98 @@
+"""
+Local load test comparing the MCP server's SSE and stateless streamable-HTTP transports.
+
+Starts server.py once per configuration, keeps --clients sessions calling a tool
+concurrently for --duration seconds and prints throughput and latency.
+
+    python load_test.py --clients 16 --duration 10 --workers 1 4
+    python load_test.py --tool busy_work   # CPU-bound tool, shows scaling with workers
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from mcp.client.streamable_http import streamablehttp_client
+
+SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+TOOL_ARGUMENTS = {"greeting": {"name": "Sarah"}, "busy_work": {"iterations": 200000}}
+
+
+def start_server(transport, workers, port):
+    env = dict(os.environ, MCP_LOAD_TEST_TOOLS="1")
+    return subprocess.Popen(
+        [sys.executable, SERVER, "--transport", transport, "--port", str(port), "--workers", str(workers)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_until_listening(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(f"http://127.0.0.1:{port}/", timeout=1)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise TimeoutError(f"Server on port {port} did not start")
+
+
+def open_streams(transport, port):
+    if transport == "sse":
+        return sse_client(url=f"http://127.0.0.1:{port}/sse")
+    return streamablehttp_client(f"http://127.0.0.1:{port}/mcp/")
+
+
+async def run_client(transport, port, tool, end, latencies):
+    async with open_streams(transport, port) as streams:
+        async with ClientSession(streams[0], streams[1]) as session:
+            await session.initialize()
+            while time.monotonic() < end:
+                start = time.perf_counter()
+                await session.call_tool(tool, TOOL_ARGUMENTS[tool])
+                latencies.append(time.perf_counter() - start)
+
+
+async def measure(transport, port, tool, clients, duration):
+    latencies = []
+    end = time.monotonic() + duration
+    await asyncio.gather(*(run_client(transport, port, tool, end, latencies) for _ in range(clients)))
+    latencies.sort()
+    return {
+        "calls_per_second": len(latencies) / duration,
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p95": latencies[int(len(latencies) * 0.95)] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4], help="Worker counts to try with streamable-http")
+    parser.add_argument("--tool", choices=sorted(TOOL_ARGUMENTS), default="greeting")
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+
+    configurations = [("sse", 1)] + [("streamable-http", workers) for workers in args.workers]
+    print(f"{args.clients} clients calling {args.tool} for {args.duration}s")
+    for transport, workers in configurations:
+        server = start_server(transport, workers, args.port)
+        try:
+            asyncio.run(wait_until_listening(args.port))
+            result = asyncio.run(measure(transport, args.port, args.tool, args.clients, args.duration))
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"  {transport:<16} workers={workers:<3} {result['calls_per_second']:8.1f} calls/s"
+              f"   p50 {result['p50']:7.1f}ms   p95 {result['p95']:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
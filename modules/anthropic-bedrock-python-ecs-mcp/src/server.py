@@ -1,6 +1,12 @@
+import argparse
+import os
+
+import uvicorn
 from mcp.server.fastmcp import FastMCP
 
-mcp = FastMCP("Documentation")
+# stateless_http: every streamable-HTTP request is self-contained, so any worker
+# process or task behind the load balancer can serve it without sticky sessions
+mcp = FastMCP("Documentation", host="0.0.0.0", port=8000, stateless_http=True)
 
 
 @mcp.tool()
@@ -17,5 +23,38 @@ def greeting(name: str) -> str:
     return f"Hello {name}!"
 
 
+if os.getenv("MCP_LOAD_TEST_TOOLS"):
+    @mcp.tool()
+    def busy_work(iterations: int = 200000) -> int:
+        """CPU-bound tool used by load_test.py"""
+        total = 0
+        for i in range(iterations):
+            total += i * i % 7
+        return total
+
+
+def create_app():
+    """Streamable-HTTP app factory, called once in every uvicorn worker"""
+    return mcp.streamable_http_app()
+
+
 if __name__ == "__main__":
-    mcp.run(transport="sse")
+    parser = argparse.ArgumentParser(description="Documentation MCP server")
+    parser.add_argument("--transport", choices=["sse", "streamable-http"], default=os.getenv("MCP_TRANSPORT", "sse"))
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKERS", "1")),
+                        help="Worker processes for streamable-http; SSE sessions live in one process, so SSE always uses one")
+    args = parser.parse_args()
+
+    if args.transport == "sse":
+        mcp.settings.port = args.port
+        mcp.run(transport="sse")
+    else:
+        uvicorn.run(
+            "server:create_app",
+            factory=True,
+            app_dir=os.path.dirname(os.path.abspath(__file__)),
+            host=mcp.settings.host,
+            port=args.port,
+            workers=args.workers,
+        )
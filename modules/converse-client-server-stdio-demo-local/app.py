@@ -44,10 +44,21 @@ def format_message(role: str, content: str) -> str:
     else:
         return f"{Colors.GREEN}Assistant: {Colors.END}{content}"
 
+def register_tools(agent, mcp_client, tools):
+    """Register MCP tools with the agent's tool manager"""
+    for tool in tools:
+        agent.tools.register_tool(
+            name=tool['name'],
+            func=mcp_client.call_tool,
+            description=tool['description'],
+            input_schema={'json': tool['inputSchema']},
+            cacheable=tool['annotations'].get('readOnlyHint', False)
+        )
+
 async def handle_resource_update(uri: str):
     """Handle updates to resources from the MCP server"""
     print(f"{Colors.YELLOW}Resource updated: {uri}{Colors.END}")
-    # You could trigger a refresh of the resource here if needed
+    # MCPClient has already invalidated (or is refreshing) its cached copy of the resource
     
 async def main():
     """
@@ -56,10 +67,12 @@ async def main():
     """
     # Initialize model configuration
     model_id = "anthropic.claude-3-5-sonnet-20241022-v2:0"
+    stream_responses = True  # Use ConverseStream so the reply is printed as it is generated
     
     # Set up the agent and tool manager
     agent = ConverseAgent(model_id)
-    agent.tools = ConverseToolManager()
+    # Cache results of read-only tools, so repeated identical calls skip the MCP round-trip
+    agent.tools = ConverseToolManager(result_cache_size=256, result_cache_ttl=300)
 
     # Define the agent's behavior through system prompt
     agent.system_prompt = """You are a helpful assistant that can use tools to help you answer 
@@ -73,7 +86,9 @@ questions and perform tasks."""
     )
 
     # Initialize MCP client with server parameters
-    async with MCPClient(server_params) as mcp_client:
+    # Cache read resources in memory; the client subscribes to each cached resource, so updates keep it fresh.
+    # Resources of servers that do not support subscriptions are never cached
+    async with MCPClient(server_params, resource_cache_size=128, refresh_resources_on_update=True) as mcp_client:
         # Register resource update handler
         mcp_client.on_resource_update(handle_resource_update)
 
@@ -91,13 +106,14 @@ questions and perform tasks."""
         tools = await mcp_client.get_available_tools()
 
         # Register each available tool with the agent
-        for tool in tools:
-            agent.tools.register_tool(
-                name=tool['name'],
-                func=mcp_client.call_tool,
-                description=tool['description'],
-                input_schema={'json': tool['inputSchema']}
-            )
+        register_tools(agent, mcp_client, tools)
+
+        # Apply later tool list changes from the server as deltas
+        async def handle_tools_changed(added, removed, changed):
+            for tool in removed:
+                agent.tools.unregister_tool(tool['name'])
+            register_tools(agent, mcp_client, added + changed)
+        mcp_client.on_tools_changed(handle_tools_changed)
 
         print_welcome()
         print_tools(tools)  # Print available tools after welcome message
@@ -117,8 +133,15 @@ questions and perform tasks."""
                 
                 # Process the prompt and display the response
                 print(f"\n{Colors.YELLOW}Thinking...{Colors.END}")
-                response = await agent.invoke_with_prompt(user_prompt)
-                print(f"\n{format_message('assistant', response)}")
+                if stream_responses:
+                    # Print tokens as they arrive instead of waiting for the whole turn
+                    print(f"\n{format_message('assistant', '')}", end='', flush=True)
+                    async for text in agent.invoke_with_prompt_stream(user_prompt):
+                        print(text, end='', flush=True)
+                    print()
+                else:
+                    response = await agent.invoke_with_prompt(user_prompt)
+                    print(f"\n{format_message('assistant', response)}")
                 
             except KeyboardInterrupt:
                 print(f"\n{Colors.CYAN}Goodbye! Thanks for chatting!{Colors.END}")
@@ -0,0 +1,93 @@
+"""
+Throughput benchmark for ConverseAgent against a local fake Bedrock endpoint.
+
+Runs many conversations on one event loop and compares a single-worker pool
+(equivalent to calling boto3 directly on the loop) with a wider pool.
+
+    python benchmark_converse.py --conversations 50 --latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from converse_agent import ConverseAgent
+from converse_tools import ConverseToolManager
+
+
+def make_handler(latency):
+    class FakeBedrockHandler(BaseHTTPRequestHandler):
+        """Answers POST /model/{modelId}/converse after a fixed delay"""
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            time.sleep(latency)
+            body = json.dumps({
+                'output': {'message': {'role': 'assistant', 'content': [{'text': 'Hello!'}]}},
+                'stopReason': 'end_turn',
+                'usage': {'inputTokens': 10, 'outputTokens': 2, 'totalTokens': 12},
+                'metrics': {'latencyMs': int(latency * 1000)}
+            }).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeBedrockHandler
+
+
+async def echo(name, arguments):
+    return arguments
+
+
+async def run(endpoint_url, conversations, max_workers):
+    # All conversations share one pool, as they would in a single server process
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    agents = []
+    for _ in range(conversations):
+        agent = ConverseAgent('fake-model', executor=executor, endpoint_url=endpoint_url)
+        agent.tools = ConverseToolManager()
+        agent.tools.register_tool('echo', echo, 'Echo the input', {'json': {}})
+        agents.append(agent)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(agent.invoke_with_prompt('Hi') for agent in agents))
+    elapsed = time.perf_counter() - start
+
+    executor.shutdown()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--conversations', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.5, help='Fake model latency in seconds')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 10, 50])
+    args = parser.parse_args()
+
+    # botocore signs every request, so it needs credentials even for a fake endpoint
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'fake')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'fake')
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(args.latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print(f"{args.conversations} conversations, {args.latency}s fake model latency")
+    for max_workers in args.workers:
+        elapsed = asyncio.run(run(endpoint_url, args.conversations, max_workers))
+        print(f"  max_workers={max_workers:<4} {elapsed:6.2f}s  {args.conversations / elapsed:7.1f} conversations/s")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Request payload size over a long session, with and without a history manager.
+
+Simulates a session where every turn makes one tool call with a large result
+and prints the size of the messages that would be sent to Bedrock.
+
+    python benchmark_history.py --turns 200
+"""
+import argparse
+import asyncio
+import json
+
+from converse_history import ChainedHistory, SlidingWindowHistory, ToolResultTruncatingHistory
+
+
+def add_turn(messages, turn, tool_result_chars):
+    messages.extend([
+        {'role': 'user', 'content': [{'text': f"Question {turn}: what is the weather in city {turn}?"}]},
+        {'role': 'assistant', 'content': [
+            {'text': 'Let me check.'},
+            {'toolUse': {'toolUseId': f"tool-{turn}", 'name': 'weather', 'input': {'location': f"city {turn}"}}}
+        ]},
+        {'role': 'user', 'content': [
+            {'toolResult': {'toolUseId': f"tool-{turn}", 'content': [{'text': 'x' * tool_result_chars}], 'status': 'success'}}
+        ]},
+        {'role': 'assistant', 'content': [{'text': f"It is sunny in city {turn}."}]},
+    ])
+
+
+async def run(turns, tool_result_chars, report_every):
+    managers = {
+        'none': None,
+        'window+truncate': ChainedHistory(
+            ToolResultTruncatingHistory(max_chars=200),
+            SlidingWindowHistory(max_tokens=8000)
+        ),
+    }
+    for label, history in managers.items():
+        messages = []
+        print(f"\n{label}")
+        for turn in range(1, turns + 1):
+            if history is not None:
+                messages = await history.compact(messages)
+            add_turn(messages, turn, tool_result_chars)
+            if turn % report_every == 0:
+                payload = len(json.dumps(messages).encode())
+                print(f"  turn {turn:4}: {len(messages):5} messages, {payload / 1024:9.1f} KiB payload")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turns', type=int, default=200)
+    parser.add_argument('--tool-result-chars', type=int, default=4000)
+    parser.add_argument('--report-every', type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.turns, args.tool_result_chars, args.report_every))
+
+
+if __name__ == "__main__":
+    main()
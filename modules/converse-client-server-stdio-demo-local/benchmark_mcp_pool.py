@@ -0,0 +1,60 @@
+"""
+Load test for MCPClientPool against mcp_server.py.
+
+Starts the demo server with its CPU-bound busy_work tool enabled and fires
+concurrent calls through pools of increasing size.
+
+    python benchmark_mcp_pool.py --calls 64 --milliseconds 50 --workers 1 2 4
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from mcp import StdioServerParameters
+
+from mcp_client import MCPClientPool
+
+
+async def run(workers, calls, milliseconds):
+    server_params = StdioServerParameters(
+        command=sys.executable,
+        args=["mcp_server.py"],
+        env={**os.environ, "MCP_LOAD_TEST_TOOLS": "1"}
+    )
+    async with MCPClientPool(server_params, size=workers) as pool:
+        peak_depths = {}
+
+        async def sample_queue_depths():
+            while True:
+                for index, depth in pool.get_queue_depths().items():
+                    peak_depths[index] = max(peak_depths.get(index, 0), depth)
+                await asyncio.sleep(0.01)
+
+        sampler = asyncio.create_task(sample_queue_depths())
+        start = time.perf_counter()
+        await asyncio.gather(*(pool.call_tool("busy_work", {"milliseconds": milliseconds}) for _ in range(calls)))
+        elapsed = time.perf_counter() - start
+        sampler.cancel()
+        return elapsed, peak_depths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=64)
+    parser.add_argument('--milliseconds', type=int, default=50, help='CPU time per tool call')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    print(f"{args.calls} calls of {args.milliseconds}ms CPU work")
+    baseline = None
+    for workers in args.workers:
+        elapsed, peak_depths = asyncio.run(run(workers, args.calls, args.milliseconds))
+        baseline = baseline or elapsed
+        print(f"  workers={workers:<3} {elapsed:6.2f}s  {args.calls / elapsed:7.1f} calls/s  "
+              f"x{baseline / elapsed:.2f}  peak queue depth per worker {list(peak_depths.values())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,39 @@
-import boto3, json, re
+import asyncio, boto3, json, re, threading, time
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 class ConverseAgent:
-    def __init__(self, model_id, region='us-west-2', system_prompt='You are a helpful assistant.'):
+    def __init__(self, model_id, region='us-west-2', system_prompt='You are a helpful assistant.',
+                 executor=None, max_workers=10, endpoint_url=None):
         self.model_id = model_id
         self.region = region
-        self.client = boto3.client('bedrock-runtime', region_name=self.region)
+        # boto3 is synchronous, so model calls run on a bounded thread pool instead of the event loop.
+        # Pass a shared executor to let many agents (conversations) share one pool and one loop.
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='converse')
+        self.client = boto3.client(
+            'bedrock-runtime',
+            region_name=self.region,
+            endpoint_url=endpoint_url,
+            config=Config(max_pool_connections=max_workers)
+        )
         self.system_prompt = system_prompt
         self.messages = []
         self.tools = None
         self.response_output_tags = [] # ['<response>', '</response>']
+        self.parallel_tool_calls = True # Run the toolUse blocks of a turn concurrently
+        self.max_concurrent_tools = 4 # Upper bound on in-flight tool calls per turn
+        self.tool_timeout = None # Seconds before a single tool call is reported as an error
+        self.max_rounds = 25 # Model calls allowed per turn before giving up
+        self.token_budget = None # Total tokens allowed per turn, None for no limit
+        self.cost_budget = None # Cost allowed per turn, priced with the two rates below
+        self.input_cost_per_1k_tokens = 0.003
+        self.output_cost_per_1k_tokens = 0.015
+        self.round_timings = [] # Per-round stop reason, model/tool seconds and usage of the last turn
+        self.turn_usage = {} # Token usage summed over the rounds of the last turn
+        self.history = None # Optional ConverseHistoryManager that bounds what is resent each turn
+        self.prompt_caching = False # Add Bedrock cache points after the system prompt and tool definitions
 
     async def invoke_with_prompt(self, prompt):
         content = [
@@ -19,83 +44,349 @@ class ConverseAgent:
         return await self.invoke(content)
 
     async def invoke(self, content):
+        result = ''
+        async for event in self._run_turn(content, stream=False):
+            if 'result' in event:
+                result = event['result']
+        return result
+
+    async def invoke_with_prompt_stream(self, prompt):
+        """
+        Streaming variant of invoke_with_prompt that yields text deltas as they arrive
+        """
+        content = [
+            {
+                'text': prompt
+            }
+        ]
+        async for text in self.invoke_stream(content):
+            yield text
+
+    async def invoke_stream(self, content):
+        """
+        Streaming variant of invoke. Tool rounds are executed between model calls and
+        the text of every round is yielded as it is generated; response_output_tags
+        are not applied because the full text is only known at the end.
+        """
+        async for event in self._run_turn(content, stream=True):
+            if 'text' in event:
+                yield event['text']
+
+    async def _run_turn(self, content, stream):
+        """
+        Drive one user turn to completion as a loop over model rounds:
+        tool_use runs the tools and calls the model again, max_tokens asks the
+        model to continue and stitches the partial text onto the answer, and
+        end_turn/stop_sequence finishes the turn. Bounded by max_rounds and the
+        token/cost budgets; if the turn fails, its messages are removed from the
+        history so the conversation stays valid.
+
+        Yields {'text': delta} while streaming and a final {'result': text}.
+        """
+        if self.history is not None:
+            self.messages = await self.history.compact(self.messages)
+
+        turn_start = len(self.messages)
         self.messages.append(
             {
-                "role": "user", 
+                "role": "user",
                 "content": content
             }
         )
-        response = self._get_converse_response()
-        return await self._handle_response(response)
+        self.round_timings = []
+        self.turn_usage = {'inputTokens': 0, 'outputTokens': 0, 'totalTokens': 0}
+        text_parts = []
 
-    def _get_converse_response(self):
-        """
-        https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/bedrock-runtime/client/converse.html
-        """
-        response = self.client.converse(
+        try:
+            for round_number in range(1, self.max_rounds + 1):
+                started = time.perf_counter()
+                if stream:
+                    response = None
+                    async for event in self._get_converse_stream_response():
+                        if 'text' in event:
+                            yield event
+                        else:
+                            response = event['response']
+                else:
+                    response = await self._get_converse_response()
+
+                # Add the response to the conversation history
+                self.messages.append(response['output']['message'])
+                stop_reason = response['stopReason']
+                usage = response.get('usage', {})
+                for key in self.turn_usage:
+                    self.turn_usage[key] += usage.get(key, 0)
+                timing = {
+                    'round': round_number,
+                    'stopReason': stop_reason,
+                    'modelSeconds': time.perf_counter() - started,
+                    'toolSeconds': 0.0,
+                    'usage': usage
+                }
+                self.round_timings.append(timing)
+
+                if stop_reason in ['end_turn', 'stop_sequence']:
+                    text_parts.append(self._get_response_text(response))
+                    yield {'result': self._apply_output_tags(''.join(text_parts))}
+                    return
+
+                self._check_budget()
+
+                if stop_reason == 'tool_use':
+                    started = time.perf_counter()
+                    tool_response = await self._get_tool_response(response)
+                    timing['toolSeconds'] = time.perf_counter() - started
+                    self.messages.append({"role": "user", "content": tool_response})
+                elif stop_reason == 'max_tokens':
+                    # Hit token limit, keep the partial text and ask the model to carry on
+                    text_parts.append(self._get_response_text(response))
+                    tool_results = self._get_truncated_tool_results(response['output']['message'])
+                    self.messages.append({"role": "user", "content": tool_results + [{'text': 'Please continue.'}]})
+                else:
+                    raise ValueError(f"Unknown stop reason: {stop_reason}")
+
+            raise ValueError(f"No final answer after {self.max_rounds} rounds")
+        except BaseException:
+            del self.messages[turn_start:]
+            raise
+
+    def _get_converse_request(self):
+        system = [
+            {
+                "text": self.system_prompt
+            }
+        ]
+        if self.prompt_caching:
+            system.append({"cachePoint": {"type": "default"}})
+        return dict(
             modelId=self.model_id,
             messages=self.messages,
-            system=[
-                {
-                    "text": self.system_prompt
-                }
-            ],
+            system=system,
             inferenceConfig={
                 "maxTokens": 8192,
                 "temperature": 0.7,
             },
-            toolConfig=self.tools.get_tools()
+            toolConfig=self.tools.get_tools(cache_point=self.prompt_caching)
         )
+
+    async def _get_converse_response(self):
+        """
+        https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/bedrock-runtime/client/converse.html
+        """
+        converse = partial(self.client.converse, **self._get_converse_request())
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(self.executor, converse)
         return(response)
-    
-    async def _handle_response(self, response):
-        # Add the response to the conversation history
-        self.messages.append(response['output']['message'])
 
-        # Do we need to do anything else?
-        stop_reason = response['stopReason']
+    async def _get_converse_stream_response(self):
+        """
+        https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/bedrock-runtime/client/converse_stream.html
 
-        if stop_reason in ['end_turn', 'stop_sequence']:
-            # Safely extract the text from the nested response structure
-            try:
-                message = response.get('output', {}).get('message', {})
-                content = message.get('content', [])
-                text = content[0].get('text', '')
-                if hasattr(self, 'response_output_tags') and len(self.response_output_tags) == 2:
-                    pattern = f"(?s).*{re.escape(self.response_output_tags[0])}(.*?){re.escape(self.response_output_tags[1])}"
-                    match = re.search(pattern, text)
-                    if match:
-                        return match.group(1)
-                return text
-            except (KeyError, IndexError):
-                return ''
-
-        elif stop_reason == 'tool_use':
+        Yields {'text': delta} for every text delta, then a final {'response': ...}
+        shaped like a converse response so the tool loop can treat both alike.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        done = object()
+        request = self._get_converse_request()
+        # Set when the consumer stops early or fails, so the reader gives up the stream
+        # instead of reading the rest of the response on the pool
+        stop = threading.Event()
+        streams = []
+
+        def read_stream():
+            # The boto3 event stream is a blocking iterator, so drain it on the pool
             try:
-                # Extract tool use details from response
-                tool_response = []
-                for content_item in response['output']['message']['content']:
-                    if 'toolUse' in content_item:
-                        tool_request = {
-                            "toolUseId": content_item['toolUse']['toolUseId'],
-                            "name": content_item['toolUse']['name'],
-                            "input": content_item['toolUse']['input']
-                        }
-                        
-                        tool_result = await self.tools.execute_tool(tool_request)
-                        tool_response.append({'toolResult': tool_result})
-                
-                return await self.invoke(tool_response)
-                
-            except KeyError as e:
-                raise ValueError(f"Missing required tool use field: {e}")
+                stream = self.client.converse_stream(**request)['stream']
+                streams.append(stream)
+                for event in stream:
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, event)
             except Exception as e:
-                raise ValueError(f"Failed to execute tool: {e}")
+                if not stop.is_set():
+                    loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                if stop.is_set():
+                    # Closed here too in case the consumer left before the stream was opened
+                    for stream in streams:
+                        stream.close()
+                else:
+                    loop.call_soon_threadsafe(queue.put_nowait, done)
 
-        elif stop_reason == 'max_tokens':
-            # Hit token limit (this is one way to handle it.)
-            await self.invoke_with_prompt('Please continue.')
+        reader = loop.run_in_executor(self.executor, read_stream)
+        try:
+            async for event in self._converse_stream_events(queue, done):
+                yield event
+            await reader
+        finally:
+            if not reader.done():
+                stop.set()
+                # Unblocks a reader waiting on the next event
+                for stream in streams:
+                    stream.close()
 
-        else:
-            raise ValueError(f"Unknown stop reason: {stop_reason}")
+    async def _converse_stream_events(self, queue, done):
+        """Assemble the converse_stream events put on the queue by read_stream"""
+        blocks = {}
+        role = 'assistant'
+        stop_reason = None
+        usage = {}
+        while True:
+            event = await queue.get()
+            if event is done:
+                break
+            if isinstance(event, Exception):
+                raise event
+
+            if 'messageStart' in event:
+                role = event['messageStart']['role']
+            elif 'contentBlockStart' in event:
+                start = event['contentBlockStart']['start']
+                if 'toolUse' in start:
+                    blocks[event['contentBlockStart']['contentBlockIndex']] = {
+                        'toolUse': {
+                            'toolUseId': start['toolUse']['toolUseId'],
+                            'name': start['toolUse']['name'],
+                            'input': ''
+                        }
+                    }
+            elif 'contentBlockDelta' in event:
+                index = event['contentBlockDelta']['contentBlockIndex']
+                delta = event['contentBlockDelta']['delta']
+                if 'text' in delta:
+                    block = blocks.setdefault(index, {'text': ''})
+                    block['text'] += delta['text']
+                    yield {'text': delta['text']}
+                elif 'toolUse' in delta:
+                    # Tool input arrives as partial JSON, parsed once the block stops
+                    blocks[index]['toolUse']['input'] += delta['toolUse']['input']
+            elif 'contentBlockStop' in event:
+                block = blocks.get(event['contentBlockStop']['contentBlockIndex'], {})
+                if 'toolUse' in block:
+                    try:
+                        block['toolUse']['input'] = json.loads(block['toolUse']['input'] or '{}')
+                    except json.JSONDecodeError:
+                        # Cut off by max_tokens; left as a string for _get_truncated_tool_results
+                        pass
+            elif 'messageStop' in event:
+                stop_reason = event['messageStop']['stopReason']
+            elif 'metadata' in event:
+                usage = event['metadata'].get('usage', {})
+
+        yield {
+            'response': {
+                'output': {
+                    'message': {
+                        'role': role,
+                        'content': [blocks[index] for index in sorted(blocks)]
+                    }
+                },
+                'stopReason': stop_reason,
+                'usage': usage
+            }
+        }
+
+    def close(self):
+        """Shut down the thread pool if this agent created it"""
+        if self._owns_executor:
+            self.executor.shutdown(wait=False)
+    
+    def get_turn_cost(self):
+        """Estimated cost of the last turn from turn_usage and the per-1K token rates"""
+        return (self.turn_usage.get('inputTokens', 0) / 1000 * self.input_cost_per_1k_tokens
+                + self.turn_usage.get('outputTokens', 0) / 1000 * self.output_cost_per_1k_tokens)
+
+    def _check_budget(self):
+        if self.token_budget is not None and self.turn_usage['totalTokens'] >= self.token_budget:
+            raise ValueError(f"Token budget exceeded: {self.turn_usage['totalTokens']} >= {self.token_budget}")
+        if self.cost_budget is not None and self.get_turn_cost() >= self.cost_budget:
+            raise ValueError(f"Cost budget exceeded: {self.get_turn_cost():.4f} >= {self.cost_budget}")
+
+    def _get_truncated_tool_results(self, message):
+        """
+        Error toolResults for the toolUse blocks of a message cut off by max_tokens.
+        Those tools are not run and their input may be partial JSON, so the input is
+        replaced with an empty object; every toolUse in the history still gets its result.
+        """
+        tool_results = []
+        for block in message.get('content', []):
+            if 'toolUse' in block:
+                tool_use = block['toolUse']
+                if not isinstance(tool_use.get('input'), dict):
+                    tool_use['input'] = {}
+                tool_results.append({
+                    'toolResult': {
+                        'toolUseId': tool_use['toolUseId'],
+                        'content': [{'text': 'The tool call was cut off by the token limit and was not run. Call it again if it is still needed.'}],
+                        'status': 'error'
+                    }
+                })
+        return tool_results
 
+    def _get_response_text(self, response):
+        # Safely extract the text from the nested response structure
+        message = response.get('output', {}).get('message', {})
+        return ''.join(block.get('text', '') for block in message.get('content', []))
+
+    def _apply_output_tags(self, text):
+        if len(self.response_output_tags) == 2:
+            pattern = f"(?s).*{re.escape(self.response_output_tags[0])}(.*?){re.escape(self.response_output_tags[1])}"
+            match = re.search(pattern, text)
+            if match:
+                return match.group(1)
+        return text
+
+    async def _get_tool_response(self, response):
+        """
+        Execute every toolUse block of a response and build the toolResult content
+        """
+        try:
+            # Extract tool use details from response
+            tool_requests = []
+            for content_item in response['output']['message']['content']:
+                if 'toolUse' in content_item:
+                    tool_requests.append({
+                        "toolUseId": content_item['toolUse']['toolUseId'],
+                        "name": content_item['toolUse']['name'],
+                        "input": content_item['toolUse']['input']
+                    })
+
+            tool_results = await self._execute_tools(tool_requests)
+            return [{'toolResult': tool_result} for tool_result in tool_results]
+
+        except KeyError as e:
+            raise ValueError(f"Missing required tool use field: {e}")
+        except Exception as e:
+            raise ValueError(f"Failed to execute tool: {e}")
+
+    async def _execute_tools(self, tool_requests):
+        """
+        Execute the tool requests of a single turn, returning results in request order
+        """
+        if not self.parallel_tool_calls or len(tool_requests) < 2:
+            return [await self._execute_tool(tool_request) for tool_request in tool_requests]
+
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrent_tools))
+
+        async def run(tool_request):
+            async with semaphore:
+                return await self._execute_tool(tool_request)
+
+        # gather preserves argument order, so results line up with the toolUse blocks
+        return await asyncio.gather(*(run(tool_request) for tool_request in tool_requests))
+
+    async def _execute_tool(self, tool_request):
+        """
+        Execute one tool request, converting a timeout into an error tool result
+        """
+        try:
+            return await asyncio.wait_for(self.tools.execute_tool(tool_request), timeout=self.tool_timeout)
+        except asyncio.TimeoutError:
+            return {
+                'toolUseId': tool_request['toolUseId'],
+                'content': [{
+                    'text': f"Error executing tool: timed out after {self.tool_timeout} seconds"
+                }],
+                'status': 'error'
+            }
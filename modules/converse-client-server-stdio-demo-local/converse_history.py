@@ -0,0 +1,146 @@
+from typing import Any, Callable, Dict, List
+import asyncio
+import json
+
+Message = Dict[str, Any]
+
+def estimate_tokens(messages: List[Message]) -> int:
+    """Rough token count of Converse messages, using ~4 characters per token"""
+    return len(json.dumps(messages, default=str)) // 4
+
+class ConverseHistoryManager:
+    """
+    Decides which messages are resent to Bedrock. The base manager keeps
+    everything; subclasses bound the history. compact() is called by
+    ConverseAgent at the start of every turn and its result replaces
+    agent.messages.
+    """
+    def __init__(self, token_estimator: Callable[[List[Message]], int] = estimate_tokens):
+        self.estimate_tokens = token_estimator
+
+    async def compact(self, messages: List[Message]) -> List[Message]:
+        return messages
+
+    def _turn_starts(self, messages: List[Message]) -> List[int]:
+        """
+        Indexes of user messages that start a turn. These are the only safe cut
+        points: cutting anywhere else could separate a toolUse from its toolResult.
+        """
+        return [
+            index for index, message in enumerate(messages)
+            if message['role'] == 'user'
+            and not any('toolResult' in block for block in message['content'])
+        ]
+
+class SlidingWindowHistory(ConverseHistoryManager):
+    """Drop the oldest whole turns until the history fits max_tokens and max_messages"""
+    def __init__(self, max_tokens: int = 20000, max_messages: int = None, **kwargs):
+        super().__init__(**kwargs)
+        self.max_tokens = max_tokens
+        self.max_messages = max_messages
+
+    async def compact(self, messages: List[Message]) -> List[Message]:
+        turn_starts = self._turn_starts(messages)
+        if not turn_starts:
+            return messages
+
+        # Walk back from the newest turn, summing per-message estimates, and keep
+        # as many whole turns as fit. The most recent turn is always kept.
+        sizes = [self.estimate_tokens([message]) for message in messages]
+        start = turn_starts[-1]
+        for candidate in reversed(turn_starts[:-1]):
+            if self.max_messages is not None and len(messages) - candidate > self.max_messages:
+                break
+            if self.max_tokens is not None and sum(sizes[candidate:]) > self.max_tokens:
+                break
+            start = candidate
+        return messages[start:]
+
+class ToolResultTruncatingHistory(ConverseHistoryManager):
+    """Shorten the text of tool results older than the last keep_recent_turns turns"""
+    def __init__(self, max_chars: int = 500, keep_recent_turns: int = 1, **kwargs):
+        super().__init__(**kwargs)
+        self.max_chars = max_chars
+        self.keep_recent_turns = keep_recent_turns
+
+    async def compact(self, messages: List[Message]) -> List[Message]:
+        turn_starts = self._turn_starts(messages)
+        if len(turn_starts) <= self.keep_recent_turns:
+            return messages
+        cutoff = turn_starts[-self.keep_recent_turns] if self.keep_recent_turns else len(messages)
+        return [self._truncate(message) for message in messages[:cutoff]] + messages[cutoff:]
+
+    def _truncate(self, message: Message) -> Message:
+        if message['role'] != 'user':
+            return message
+        content = []
+        for block in message['content']:
+            if 'toolResult' in block:
+                tool_result = dict(block['toolResult'])
+                tool_result['content'] = [self._truncate_text(item) for item in tool_result['content']]
+                block = {'toolResult': tool_result}
+            content.append(block)
+        return {'role': message['role'], 'content': content}
+
+    def _truncate_text(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        text = item.get('text')
+        if text is None or len(text) <= self.max_chars:
+            return item
+        return {'text': f"{text[:self.max_chars]}... [truncated {len(text) - self.max_chars} characters]"}
+
+class SummarizingHistory(ConverseHistoryManager):
+    """
+    Once the history exceeds max_tokens, summarise everything before the last
+    keep_recent_turns turns with a cheaper model and prepend the summary to the
+    first kept user message.
+    """
+    def __init__(self, client, model_id: str = 'anthropic.claude-3-haiku-20240307-v1:0',
+                 max_tokens: int = 20000, keep_recent_turns: int = 4, executor=None, **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+        self.model_id = model_id
+        self.max_tokens = max_tokens
+        self.keep_recent_turns = keep_recent_turns
+        self.executor = executor
+
+    async def compact(self, messages: List[Message]) -> List[Message]:
+        if self.estimate_tokens(messages) <= self.max_tokens:
+            return messages
+        turn_starts = self._turn_starts(messages)
+        if len(turn_starts) <= self.keep_recent_turns:
+            return messages
+
+        cutoff = turn_starts[-self.keep_recent_turns]
+        summary = await self._summarize(messages[:cutoff])
+        first = messages[cutoff]
+        summary_block = {'text': f"Summary of the earlier conversation:\n{summary}"}
+        return [{'role': first['role'], 'content': [summary_block] + first['content']}] + messages[cutoff + 1:]
+
+    async def _summarize(self, messages: List[Message]) -> str:
+        # Send the transcript as plain text: toolUse blocks would require a toolConfig
+        transcript = json.dumps(messages, default=str)
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(self.executor, lambda: self.client.converse(
+            modelId=self.model_id,
+            messages=[{
+                'role': 'user',
+                'content': [{'text': f"Summarise this conversation, keeping facts, decisions and tool results needed to continue it:\n{transcript}"}]
+            }],
+            inferenceConfig={
+                "maxTokens": 1024,
+                "temperature": 0.0,
+            }
+        ))
+        content = response['output']['message']['content']
+        return ''.join(block.get('text', '') for block in content)
+
+class ChainedHistory(ConverseHistoryManager):
+    """Apply several history managers in order, e.g. truncate tool results then slide the window"""
+    def __init__(self, *managers: ConverseHistoryManager, **kwargs):
+        super().__init__(**kwargs)
+        self.managers = managers
+
+    async def compact(self, messages: List[Message]) -> List[Message]:
+        for manager in self.managers:
+            messages = await manager.compact(messages)
+        return messages
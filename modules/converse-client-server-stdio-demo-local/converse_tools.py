@@ -1,56 +1,89 @@
 from typing import Any, Dict, List, Callable
+from collections import OrderedDict
 import inspect
 import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
 
 class ConverseToolManager:
-    def __init__(self):
+    def __init__(self, result_cache_size: int = 0, result_cache_ttl: float = 300.0):
+        """
+        result_cache_size enables an LRU cache of results for tools registered as
+        cacheable (0 disables it); entries expire after result_cache_ttl seconds.
+        """
         self._tools = {}
         self._name_mapping = {}  # Maps sanitized names to original names
+        self._tool_config = {}  # Cached toolConfig, keyed by whether it ends in a cache point
+        self.result_cache_size = result_cache_size
+        self.result_cache_ttl = result_cache_ttl
+        self._result_cache = OrderedDict()  # (name, canonical input) -> (expires at, result text)
+        self.cache_hits = 0
+        self.cache_misses = 0
     
     def _sanitize_name(self, name: str) -> str:
         """Convert hyphenated names to underscore format"""
         return name.replace('-', '_')
     
-    def register_tool(self, name: str, func: Callable, description: str, input_schema: Dict):
+    def register_tool(self, name: str, func: Callable, description: str, input_schema: Dict, cacheable: bool = False):
         """
-        Register a new tool with the system, sanitizing the name for Bedrock compatibility
+        Register a new tool with the system, sanitizing the name for Bedrock compatibility.
+        Only mark a tool cacheable if identical input always gives the same result
+        without side effects (e.g. the MCP readOnlyHint annotation).
         """
         sanitized_name = self._sanitize_name(name)
-        print(f"Registering tool - Original name: {name}, Sanitized name: {sanitized_name}")
+        logger.debug("Registering tool - Original name: %s, Sanitized name: %s", name, sanitized_name)
         self._name_mapping[sanitized_name] = name
         self._tools[sanitized_name] = {
             'function': func,
             'description': description,
             'input_schema': input_schema,
-            'original_name': name
+            'original_name': name,
+            'cacheable': cacheable
         }
+        self._tool_config.clear()
+        self._invalidate_results(sanitized_name)
 
-    def get_tools(self) -> Dict[str, List[Dict]]:
+    def get_tools(self, cache_point: bool = False) -> Dict[str, List[Dict]]:
         """
-        Generate the tools specification using sanitized names
+        Generate the tools specification using sanitized names. The result is built
+        once and reused until the registered tools change. With cache_point, a Bedrock
+        prompt-caching checkpoint follows the tool definitions so they are not
+        reprocessed on every call.
         """
-        tool_specs = []
-        for sanitized_name, tool in self._tools.items():
-            # Ensure input schema has the correct structure
-            input_schema = tool['input_schema']
-            if 'json' not in input_schema:
-                input_schema = {'json': input_schema}
-            if 'type' not in input_schema['json']:
-                input_schema['json']['type'] = 'object'
-            if 'properties' not in input_schema['json']:
-                input_schema['json']['properties'] = {}
-            if 'required' not in input_schema['json']:
-                input_schema['json']['required'] = []
-
-            tool_specs.append({
-                'toolSpec': {
-                    'name': sanitized_name,  # Use sanitized name for Bedrock
-                    'description': tool['description'],
-                    'inputSchema': input_schema
+        if cache_point not in self._tool_config:
+            tool_specs = [
+                {
+                    'toolSpec': {
+                        'name': sanitized_name,  # Use sanitized name for Bedrock
+                        'description': tool['description'],
+                        'inputSchema': self._normalize_schema(tool['input_schema'])
+                    }
                 }
-            })
-        
-        return {'tools': tool_specs}
+                for sanitized_name, tool in self._tools.items()
+            ]
+            if cache_point and tool_specs:
+                tool_specs.append({'cachePoint': {'type': 'default'}})
+            self._tool_config[cache_point] = {'tools': tool_specs}
+
+        return self._tool_config[cache_point]
+
+    def _normalize_schema(self, input_schema: Dict) -> Dict:
+        """Ensure input schema has the correct structure, without modifying the registered one"""
+        schema = dict(input_schema['json'] if 'json' in input_schema else input_schema)
+        schema.setdefault('type', 'object')
+        schema.setdefault('properties', {})
+        schema.setdefault('required', [])
+        return {'json': schema}
+
+    def unregister_tool(self, name: str):
+        """Remove a single tool, leaving the others registered"""
+        sanitized_name = self._sanitize_name(name)
+        self._tools.pop(sanitized_name, None)
+        self._name_mapping.pop(sanitized_name, None)
+        self._tool_config.clear()
+        self._invalidate_results(sanitized_name)
 
     async def execute_tool(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -61,15 +94,30 @@ class ConverseToolManager:
         tool_input = payload['input']
         
         print(f"Executing tool - Requested name: {sanitized_name}")
-        print(f"Available tools: {list(self._tools.keys())}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Available tools: %s", list(self._tools.keys()))
 
         if sanitized_name not in self._tools:
             raise ValueError(f"Unknown tool: {sanitized_name}")
+        cache_key = self._cache_key(sanitized_name, tool_input)
+        if cache_key is not None:
+            cached_text = self._get_cached_result(cache_key)
+            if cached_text is not None:
+                return {
+                    'toolUseId': tool_use_id,
+                    'content': [{
+                        'text': cached_text
+                    }],
+                    'status': 'success'
+                }
         try:
             tool_func = self._tools[sanitized_name]['function']
             # Use original name when calling the actual function
             original_name = self._tools[sanitized_name]['original_name']
             result = await tool_func(original_name, tool_input)
+            # MCP reports tool failures in the result rather than raising; never cache those
+            if cache_key is not None and not getattr(result, 'isError', False):
+                self._put_cached_result(cache_key, str(result))
             return {
                 'toolUseId': tool_use_id,
                 'content': [{
@@ -89,4 +137,51 @@ class ConverseToolManager:
     def clear_tools(self):
         """Clear all registered tools"""
         self._tools.clear()
+        self._name_mapping.clear()
+        self._tool_config.clear()
+        self._result_cache.clear()
+
+    # Result cache
+
+    def get_cache_stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size of the result cache"""
+        return {
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'size': len(self._result_cache)
+        }
+
+    def clear_result_cache(self):
+        """Drop all cached tool results"""
+        self._result_cache.clear()
+
+    def _cache_key(self, sanitized_name: str, tool_input: Dict[str, Any]):
+        """Key on tool name plus canonical JSON input, or None if the call must not be cached"""
+        if self.result_cache_size <= 0 or not self._tools[sanitized_name]['cacheable']:
+            return None
+        try:
+            return (sanitized_name, json.dumps(tool_input, sort_keys=True, separators=(',', ':')))
+        except (TypeError, ValueError):
+            return None
+
+    def _get_cached_result(self, cache_key):
+        entry = self._result_cache.get(cache_key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._result_cache.move_to_end(cache_key)
+            self.cache_hits += 1
+            return entry[1]
+        if entry is not None:
+            del self._result_cache[cache_key]
+        self.cache_misses += 1
+        return None
+
+    def _put_cached_result(self, cache_key, text: str):
+        self._result_cache[cache_key] = (time.monotonic() + self.result_cache_ttl, text)
+        self._result_cache.move_to_end(cache_key)
+        while len(self._result_cache) > self.result_cache_size:
+            self._result_cache.popitem(last=False)
+
+    def _invalidate_results(self, sanitized_name: str):
+        for cache_key in [key for key in self._result_cache if key[0] == sanitized_name]:
+            del self._result_cache[cache_key]
     
\ No newline at end of file
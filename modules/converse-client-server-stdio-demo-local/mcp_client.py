@@ -1,16 +1,43 @@
-from mcp import ClientSession, StdioServerParameters
+from mcp import ClientSession, StdioServerParameters, types
 from mcp.client.stdio import stdio_client
-from typing import Any, List
+from mcp.shared.exceptions import McpError
+from typing import Any, Dict, List
+from collections import OrderedDict
+from functools import partial
 import asyncio
 import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
 
 class MCPClient:
-    def __init__(self, server_params: StdioServerParameters):
+    def __init__(self, server_params: StdioServerParameters, resource_cache_size: int = 0,
+                 refresh_resources_on_update: bool = False):
+        """
+        resource_cache_size enables an LRU cache of read resources (0 disables it).
+        A resource is only cached once the client has subscribed to it, so the server
+        reports its updates. When a cached resource is updated, the entry is dropped,
+        or re-read in the background if refresh_resources_on_update is set. Reads
+        that overlap an update are returned but not cached.
+        """
         self.server_params = server_params
         self.session = None
         self._client = None
         self._resource_update_callbacks = []
-        self._notification_task = None
+        self._tools_changed_callbacks = []
+        self._callback_tasks = set()
+        self._tools = None  # Formatted tools by name, fetched on first use
+        self._tools_refresh_task = None
+        self._tools_refresh_pending = False
+        self.resource_cache_size = resource_cache_size
+        self.refresh_resources_on_update = refresh_resources_on_update
+        self._resource_cache = OrderedDict()  # URI -> read_resource result
+        self._resource_refresh_tasks = {}
+        self._resource_versions = {}  # URI -> number of update notifications received
+        self._subscriptions = {}  # URI -> whether the server accepted the subscription
+        self.resource_cache_hits = 0
+        self.resource_cache_misses = 0
         
     async def __aenter__(self):
         """Async context manager entry"""
@@ -19,73 +46,130 @@ class MCPClient:
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit"""
-        if self._notification_task:
-            self._notification_task.cancel()
-            try:
-                await self._notification_task
-            except asyncio.CancelledError:
-                pass
+        if self._tools_refresh_task:
+            self._tools_refresh_task.cancel()
+        for task in [*self._resource_refresh_tasks.values(), *self._callback_tasks]:
+            task.cancel()
         if self.session:
             await self.session.__aexit__(exc_type, exc_val, exc_tb)
         if self._client:
             await self._client.__aexit__(exc_type, exc_val, exc_tb)
 
-    async def _handle_incoming_messages(self):
-        """Process incoming messages from the session"""
-        async for message in self.session.incoming_messages:
-            if isinstance(message, Exception):
-                print(f"Error in message handling: {message}")
-                continue
-                
-            if hasattr(message, 'method') and message.method == "resource/updated":
-                uri = message.params.uri
-                for callback in self._resource_update_callbacks:
-                    try:
-                        await callback(uri)
-                    except Exception as e:
-                        print(f"Error in resource update callback: {e}")
+    async def _handle_message(self, message):
+        """
+        Handle a message from the session. This runs inside the session's receive
+        loop, so anything that may send a request of its own runs in a task.
+        """
+        if isinstance(message, Exception):
+            print(f"Error in message handling: {message}")
+            return
+
+        # Server notifications arrive wrapped in a root model
+        message = getattr(message, 'root', message)
+        method = getattr(message, 'method', None)
+
+        if method == "notifications/tools/list_changed":
+            self._schedule_tools_refresh()
+        elif method in ("notifications/resources/updated", "resource/updated"):
+            uri = message.params.uri
+            self._resource_updated(str(uri))
+            for callback in self._resource_update_callbacks:
+                task = asyncio.create_task(self._run_resource_update_callback(callback, uri))
+                self._callback_tasks.add(task)
+                task.add_done_callback(self._callback_tasks.discard)
+
+    async def _run_resource_update_callback(self, callback, uri):
+        try:
+            await callback(uri)
+        except Exception as e:
+            print(f"Error in resource update callback: {e}")
 
     async def connect(self):
         """Establishes connection to MCP server"""
         self._client = stdio_client(self.server_params)
         self.read, self.write = await self._client.__aenter__()
-        session = ClientSession(self.read, self.write)
+        session = ClientSession(self.read, self.write, message_handler=self._handle_message)
         self.session = await session.__aenter__()
         await self.session.initialize()
-        
-        # Start message handling task
-        self._notification_task = asyncio.create_task(self._handle_incoming_messages())
 
     # Tools
 
-    async def get_available_tools(self) -> List[Any]:
-        """List available tools"""
+    async def get_available_tools(self, refresh: bool = False) -> List[Any]:
+        """List available tools, fetched once and then kept current by list_changed notifications"""
         if not self.session:
             raise RuntimeError("Not connected to MCP server")
-            
-        response = await self.session.list_tools()
-        print("Raw tools data:", response)  # Debug print
-        
-        # Extract the actual tools from the response
-        tools = response.tools if hasattr(response, 'tools') else []
-        
-        # Convert tools to list of dictionaries with expected attributes
-        formatted_tools = [
-            {
-                'name': tool.name,
-                'description': str(tool.description) if tool.description is not None else "No description available",
-                'inputSchema': {
-                    'json': {
-                        'type': 'object',
-                        'properties': tool.inputSchema.get('properties', {}) if tool.inputSchema else {},
-                        'required': tool.inputSchema.get('required', []) if tool.inputSchema else []
-                    }
+
+        if self._tools is None or refresh:
+            self._tools = await self._list_all_tools()
+        return list(self._tools.values())
+
+    async def _list_all_tools(self) -> Dict[str, Any]:
+        """Fetch every page of the tool list"""
+        tools = {}
+        cursor = None
+        while True:
+            response = await self.session.list_tools(cursor=cursor) if cursor else await self.session.list_tools()
+            for tool in getattr(response, 'tools', []):
+                tools[tool.name] = self._format_tool(tool)
+            cursor = getattr(response, 'nextCursor', None)
+            if not cursor:
+                break
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Formatted tools: %s", json.dumps(list(tools.values()), indent=2))
+        return tools
+
+    def _format_tool(self, tool) -> Dict[str, Any]:
+        """Convert an MCP tool to a dictionary with the expected attributes"""
+        return {
+            'name': tool.name,
+            'description': str(tool.description) if tool.description is not None else "No description available",
+            'inputSchema': {
+                'json': {
+                    'type': 'object',
+                    'properties': tool.inputSchema.get('properties', {}) if tool.inputSchema else {},
+                    'required': tool.inputSchema.get('required', []) if tool.inputSchema else []
                 }
-            }
-            for tool in tools
-        ]
-        print("Formatted tools:", json.dumps(formatted_tools, indent=2))  # Debug print
-        return formatted_tools
+            },
+            # Behaviour hints such as readOnlyHint (only sent by newer MCP servers)
+            'annotations': tool.annotations.model_dump(exclude_none=True) if getattr(tool, 'annotations', None) else {}
+        }
+
+    def on_tools_changed(self, callback):
+        """
+        Register a callback to be called with (added, removed, changed) tool lists
+        when the server reports that its tool list changed
+        """
+        self._tools_changed_callbacks.append(callback)
+
+    def _schedule_tools_refresh(self):
+        # Refresh outside the notification loop; coalesce bursts of notifications
+        if self._tools_refresh_task and not self._tools_refresh_task.done():
+            self._tools_refresh_pending = True
+            return
+        self._tools_refresh_task = asyncio.create_task(self._refresh_tools())
+
+    async def _refresh_tools(self):
+        while True:
+            self._tools_refresh_pending = False
+            try:
+                previous = self._tools or {}
+                current = await self._list_all_tools()
+                self._tools = current
+                added = [tool for name, tool in current.items() if name not in previous]
+                removed = [tool for name, tool in previous.items() if name not in current]
+                changed = [tool for name, tool in current.items() if name in previous and previous[name] != tool]
+                logger.info("Tool list changed: %d added, %d removed, %d changed", len(added), len(removed), len(changed))
+                if added or removed or changed:
+                    for callback in self._tools_changed_callbacks:
+                        try:
+                            await callback(added, removed, changed)
+                        except Exception as e:
+                            print(f"Error in tools changed callback: {e}")
+            except Exception as e:
+                print(f"Error refreshing tools: {e}")
+            if not self._tools_refresh_pending:
+                return
 
     async def call_tool(self, tool_name: str, arguments: dict) -> Any:
         """Call a tool with given arguments"""
@@ -102,19 +186,418 @@ class MCPClient:
         if not self.session:
             raise RuntimeError("Not connected to MCP server")
             
-        resources = await self.session.list_resources()
-        _, resources_list = resources
-        _, resources_list = resources_list
-        return resources_list
+        result = await self.session.list_resources()
+        return result.resources
     
     async def get_resource(self, uri: str) -> Any:
-        """Get a resource"""
+        """Get a resource, from the resource cache when it is enabled and holds the URI"""
         if not self.session:
             raise RuntimeError("Not connected to MCP server")
-            
+
+        key = str(uri)
+        if key in self._resource_cache:
+            self._resource_cache.move_to_end(key)
+            self.resource_cache_hits += 1
+            return self._resource_cache[key]
+
+        # subscribed before reading, so no update between the read and the subscription is missed
+        cacheable = self.resource_cache_size > 0 and await self._subscribe(key)
+        version = self._resource_versions.get(key, 0)
         resource = await self.session.read_resource(uri)
+        if self.resource_cache_size > 0:
+            self.resource_cache_misses += 1
+            # an update that arrived while reading may not be reflected in this result
+            if cacheable and self._resource_versions.get(key, 0) == version:
+                self._cache_resource(key, resource)
         return resource
 
+    async def _subscribe(self, key: str) -> bool:
+        """
+        Subscribe to updates of a resource once; without a subscription it is never cached.
+        Tried even when the server does not advertise subscriptions, as the Python SDK never does.
+        """
+        if key not in self._subscriptions:
+            try:
+                await self.session.subscribe_resource(key)
+                self._subscriptions[key] = True
+            except Exception as e:
+                print(f"Error subscribing to resource {key}, not caching it: {e}")
+                self._subscriptions[key] = False
+        return self._subscriptions[key]
+
+    def _cache_resource(self, key: str, resource: Any):
+        self._resource_cache[key] = resource
+        self._resource_cache.move_to_end(key)
+        while len(self._resource_cache) > self.resource_cache_size:
+            self._resource_cache.popitem(last=False)
+
+    def _resource_updated(self, key: str):
+        """Invalidate or refresh a cached resource; uncached URIs only get their version bumped"""
+        if self.resource_cache_size <= 0:
+            return
+        self._resource_versions[key] = self._resource_versions.get(key, 0) + 1
+        if key not in self._resource_cache:
+            return
+        if not self.refresh_resources_on_update:
+            del self._resource_cache[key]
+        elif key not in self._resource_refresh_tasks:
+            self._resource_refresh_tasks[key] = asyncio.create_task(self._refresh_resource(key))
+
+    async def _refresh_resource(self, key: str):
+        try:
+            # read again if another update arrives while reading
+            while key in self._resource_cache:
+                version = self._resource_versions[key]
+                resource = await self.session.read_resource(key)
+                if self._resource_versions[key] == version:
+                    if key in self._resource_cache:
+                        self._resource_cache[key] = resource
+                    break
+        except Exception as e:
+            print(f"Error refreshing resource {key}: {e}")
+            self._resource_cache.pop(key, None)
+        finally:
+            self._resource_refresh_tasks.pop(key, None)
+
+    def get_resource_cache_stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size of the resource cache"""
+        return {
+            'hits': self.resource_cache_hits,
+            'misses': self.resource_cache_misses,
+            'size': len(self._resource_cache)
+        }
+
     def on_resource_update(self, callback):
         """Register a callback to be called when resources are updated"""
-        self._resource_update_callbacks.append(callback)
\ No newline at end of file
+        self._resource_update_callbacks.append(callback)
+
+class _PoolWorker:
+    """
+    One MCPClient owned by its own task. stdio_client runs an anyio task group,
+    which must be entered and exited from the same task, so the worker task keeps
+    the connection open while other tasks send requests through its session.
+    """
+    def __init__(self, index: int, server_params: StdioServerParameters, client_options: Dict[str, Any] = None):
+        self.index = index
+        self.server_params = server_params
+        self.client_options = client_options or {}
+        self.client = None
+        self.in_flight = 0
+        self.restarts = 0
+        self.generation = 0
+        self._task = None
+        self._stop = None
+
+    async def start(self):
+        ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._task = asyncio.create_task(self._run(ready))
+        ready_wait = asyncio.create_task(ready.wait())
+        await asyncio.wait({self._task, ready_wait}, return_when=asyncio.FIRST_COMPLETED)
+        ready_wait.cancel()
+        if self._task.done():
+            task, self._task = self._task, None
+            task.result()  # Raise the connection error
+        self.generation += 1
+
+    async def _run(self, ready: asyncio.Event):
+        async with MCPClient(self.server_params, **self.client_options) as client:
+            self.client = client
+            ready.set()
+            await self._stop.wait()
+        self.client = None
+
+    async def stop(self, timeout: float = 5.0):
+        if not self._task:
+            return
+        self._stop.set()
+        try:
+            await asyncio.wait_for(self._task, timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+        except Exception as e:
+            print(f"Error stopping MCP worker {self.index}: {e}")
+        self.client = None
+        self._task = None
+
+class MCPClientPool:
+    """
+    Pool of MCP server processes started from the same StdioServerParameters.
+    Tool calls go to the worker with the fewest in-flight requests, so a slow
+    tool only holds up its own worker, and crashed workers are restarted. A worker
+    that fails to restart is retried in the background with exponential backoff,
+    up to max_restart_delay seconds apart.
+    Offers the same tool and resource methods as MCPClient.
+    """
+    def __init__(self, server_params: StdioServerParameters, size: int = 4, max_restart_delay: float = 30.0):
+        self.server_params = server_params
+        self.workers = [_PoolWorker(index, server_params) for index in range(size)]
+        self.max_restart_delay = max_restart_delay
+        self._restart_lock = asyncio.Lock()
+        self._revivals = {}  # Worker index -> task retrying a worker that failed to restart
+        self._resource_update_callbacks = []
+
+    async def __aenter__(self):
+        """Async context manager entry"""
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Async context manager exit"""
+        for task in list(self._revivals.values()):
+            task.cancel()
+        await asyncio.gather(*(worker.stop() for worker in self.workers))
+
+    async def connect(self):
+        """Start every worker process concurrently, stopping them all again if any fails"""
+        results = await asyncio.gather(*(worker.start() for worker in self.workers), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                await self.__aexit__(None, None, None)
+                raise result
+        for worker in self.workers:
+            self._register_callbacks(worker)
+
+    @property
+    def session(self):
+        return self.workers[0].client.session if self.workers[0].client else None
+
+    def get_queue_depths(self) -> Dict[int, int]:
+        """In-flight requests per worker"""
+        return {worker.index: worker.in_flight for worker in self.workers}
+
+    def _least_loaded(self) -> _PoolWorker:
+        workers = [worker for worker in self.workers if worker.client]
+        if not workers:
+            raise RuntimeError("No MCP workers available")
+        return min(workers, key=lambda worker: worker.in_flight)
+
+    async def _call(self, method: str, *args, **kwargs) -> Any:
+        """Run a client method on the least-loaded worker, restarting it once if it has crashed"""
+        for attempt in range(2):
+            worker = self._least_loaded()
+            generation = worker.generation
+            worker.in_flight += 1
+            try:
+                return await getattr(worker.client, method)(*args, **kwargs)
+            except Exception as e:
+                if isinstance(e, McpError) and e.error.code != types.CONNECTION_CLOSED:
+                    # The server answered with an error, the worker itself is fine
+                    raise
+                if attempt:
+                    raise
+                print(f"MCP worker {worker.index} failed ({e}), restarting")
+                await self._restart(worker, generation)
+            finally:
+                worker.in_flight -= 1
+
+    async def _restart(self, worker: _PoolWorker, generation: int):
+        async with self._restart_lock:
+            if worker.generation != generation or worker.index in self._revivals:
+                return  # Another caller already restarted it, or it is being retried
+            await worker.stop(timeout=1.0)
+            try:
+                await self._start_worker(worker)
+            except Exception as e:
+                print(f"MCP worker {worker.index} failed to restart ({e}), retrying in the background")
+                self._revivals[worker.index] = asyncio.create_task(self._revive(worker))
+
+    async def _revive(self, worker: _PoolWorker):
+        """Retry starting a worker with exponential backoff until it comes back"""
+        delay = 1.0
+        try:
+            while True:
+                await asyncio.sleep(delay)
+                async with self._restart_lock:
+                    try:
+                        await self._start_worker(worker)
+                        return
+                    except Exception as e:
+                        delay = min(delay * 2, self.max_restart_delay)
+                        print(f"MCP worker {worker.index} failed to restart ({e}), retrying in {delay:.0f}s")
+        finally:
+            self._revivals.pop(worker.index, None)
+
+    async def _start_worker(self, worker: _PoolWorker):
+        await worker.start()
+        worker.restarts += 1
+        self._register_callbacks(worker)
+
+    def _register_callbacks(self, worker: _PoolWorker):
+        for callback in self._resource_update_callbacks:
+            worker.client.on_resource_update(callback)
+
+    # Tools
+
+    async def get_available_tools(self) -> List[Any]:
+        """List available tools"""
+        return await self._call('get_available_tools')
+
+    async def call_tool(self, tool_name: str, arguments: dict) -> Any:
+        """Call a tool with given arguments on the least-loaded worker"""
+        return await self._call('call_tool', tool_name, arguments)
+
+    # Resources
+
+    async def get_available_resources(self) -> List[Any]:
+        """List available resources"""
+        return await self._call('get_available_resources')
+
+    async def get_resource(self, uri: str) -> Any:
+        """Get a resource"""
+        return await self._call('get_resource', uri)
+
+    def on_resource_update(self, callback):
+        """Register a callback to be called when resources are updated"""
+        self._resource_update_callbacks.append(callback)
+        for worker in self.workers:
+            if worker.client:
+                worker.client.on_resource_update(callback)
+
+class MultiServerMCPClient:
+    """
+    Connects to several MCP servers at once and presents their tools as one set.
+    Servers are started, initialised and listed concurrently. Tool names are
+    prefixed with the server name ("server__tool") so servers cannot collide,
+    and call_tool routes each call back to the server that owns the tool.
+    Offers the same tool and resource methods as MCPClient; client_options
+    (e.g. resource_cache_size) are passed to the MCPClient of every server.
+    """
+    def __init__(self, servers: Dict[str, StdioServerParameters], namespace_tools: bool = True, **client_options):
+        self.workers = {name: _PoolWorker(name, server_params, client_options) for name, server_params in servers.items()}
+        self.namespace_tools = namespace_tools
+        self.startup_times = {}  # Server name -> seconds to connect, initialise and list tools
+        self._tools = []
+        self._tool_routes = {}  # Exposed tool name -> (server name, tool name on that server)
+        self._resource_routes = {}  # Resource URI -> server name, from the last resource listing
+        self._resource_update_callbacks = []
+        self._tools_changed_callbacks = []
+
+    async def __aenter__(self):
+        """Async context manager entry"""
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Async context manager exit"""
+        await asyncio.gather(*(worker.stop() for worker in self.workers.values()))
+
+    async def connect(self):
+        """
+        Connect to every server concurrently and build the combined tool list.
+        If any server fails, the servers that did start are stopped again.
+        """
+        results = await asyncio.gather(*(self._start(name) for name in self.workers), return_exceptions=True)
+        try:
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+
+            self._tools = []
+            self._tool_routes = {}
+            for name, tools in results:
+                for tool in tools:
+                    exposed_name = self._exposed_name(name, tool['name'])
+                    if exposed_name in self._tool_routes:
+                        raise ValueError(f"Duplicate tool name {exposed_name} from server {name}")
+                    self._tool_routes[exposed_name] = (name, tool['name'])
+                    self._tools.append({**tool, 'name': exposed_name})
+        except BaseException:
+            await self.__aexit__(None, None, None)
+            raise
+
+        for name, worker in self.workers.items():
+            for callback in self._resource_update_callbacks:
+                worker.client.on_resource_update(callback)
+            worker.client.on_tools_changed(partial(self._server_tools_changed, name))
+
+    async def _start(self, name: str):
+        start = time.perf_counter()
+        worker = self.workers[name]
+        await worker.start()
+        tools = await worker.client.get_available_tools()
+        self.startup_times[name] = time.perf_counter() - start
+        return name, tools
+
+    def _exposed_name(self, server_name: str, tool_name: str) -> str:
+        return f"{server_name}__{tool_name}" if self.namespace_tools else tool_name
+
+    def get_client(self, name: str) -> MCPClient:
+        """The MCPClient connected to the named server"""
+        return self.workers[name].client
+
+    # Tools
+
+    async def get_available_tools(self) -> List[Any]:
+        """List tools from every server, kept current by each server's list_changed notifications"""
+        return list(self._tools)
+
+    async def call_tool(self, tool_name: str, arguments: dict) -> Any:
+        """Call a tool on the server that owns it"""
+        if tool_name not in self._tool_routes:
+            raise ValueError(f"Unknown tool: {tool_name}")
+        server_name, server_tool_name = self._tool_routes[tool_name]
+        return await self.workers[server_name].client.call_tool(server_tool_name, arguments)
+
+    def on_tools_changed(self, callback):
+        """
+        Register a callback to be called with (added, removed, changed) tool lists,
+        under their exposed names, when any server reports that its tool list changed
+        """
+        self._tools_changed_callbacks.append(callback)
+
+    async def _server_tools_changed(self, server_name: str, added, removed, changed):
+        def owned(tools):
+            # Tools skipped for a name clash belong to another server under that name
+            exposed = [{**tool, 'name': self._exposed_name(server_name, tool['name'])} for tool in tools]
+            return [tool for tool in exposed if self._tool_routes.get(tool['name'], (None,))[0] == server_name]
+        removed = owned(removed)
+        changed = owned(changed)
+        exposed = []
+        for tool in added:
+            exposed_name = self._exposed_name(server_name, tool['name'])
+            if exposed_name in self._tool_routes:
+                print(f"Ignoring tool {exposed_name} from server {server_name}: the name is already taken")
+                continue
+            self._tool_routes[exposed_name] = (server_name, tool['name'])
+            exposed.append({**tool, 'name': exposed_name})
+        added = exposed
+
+        for tool in removed:
+            self._tool_routes.pop(tool['name'], None)
+        replaced = {tool['name'] for tool in removed + changed}
+        self._tools = [tool for tool in self._tools if tool['name'] not in replaced] + changed + added
+
+        for callback in self._tools_changed_callbacks:
+            try:
+                await callback(added, removed, changed)
+            except Exception as e:
+                print(f"Error in tools changed callback: {e}")
+
+    # Resources
+
+    async def get_available_resources(self) -> List[Any]:
+        """List resources from every server"""
+        names = list(self.workers)
+        listings = await asyncio.gather(*(self.workers[name].client.get_available_resources() for name in names))
+        resources = []
+        for name, listing in zip(names, listings):
+            for resource in listing:
+                self._resource_routes[str(resource.uri)] = name
+            resources.extend(listing)
+        return resources
+
+    async def get_resource(self, uri: str) -> Any:
+        """Get a resource from the server that listed it"""
+        if str(uri) not in self._resource_routes:
+            await self.get_available_resources()
+        if str(uri) not in self._resource_routes:
+            raise ValueError(f"Unknown resource: {uri}")
+        return await self.workers[self._resource_routes[str(uri)]].client.get_resource(uri)
+
+    def on_resource_update(self, callback):
+        """Register a callback to be called when any server's resources are updated"""
+        self._resource_update_callbacks.append(callback)
+        for worker in self.workers.values():
+            if worker.client:
+                worker.client.on_resource_update(callback)
@@ -1,7 +1,9 @@
 from mcp.server.fastmcp import FastMCP
 from typing import Dict, Any
 import logging
+import os
 import sys
+import time
 
 # Configure logging to write to both file and stderr
 logging.basicConfig(
@@ -52,6 +54,16 @@ def weather(location: str) -> Dict[str, Any]:
     logger.info(f"Weather response: {response}")
     return response
 
+if os.environ.get("MCP_LOAD_TEST_TOOLS"):
+    @mcp.tool()
+    def busy_work(milliseconds: int) -> Dict[str, Any]:
+        """Burn CPU for the given number of milliseconds (load testing only)"""
+        deadline = time.perf_counter() + milliseconds / 1000
+        iterations = 0
+        while time.perf_counter() < deadline:
+            iterations += 1
+        return {"iterations": iterations}
+
 if __name__ == "__main__":
     logger.info("Starting MCP Demo Server...")
     try:
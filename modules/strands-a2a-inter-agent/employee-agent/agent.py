@@ -1,15 +1,30 @@
+import asyncio
+import atexit
 import os
+from collections import OrderedDict
 
+import uvicorn
+from a2a.server.agent_execution import AgentExecutor, RequestContext
+from a2a.server.events import EventQueue
+from a2a.server.request_handlers import DefaultRequestHandler
+from a2a.server.tasks import InMemoryTaskStore
+from a2a.types import InternalError, UnsupportedOperationError
+from a2a.utils.errors import ServerError
 from mcp.client.streamable_http import streamablehttp_client
 from strands import Agent
 from strands.models import BedrockModel
 from strands.tools.mcp.mcp_client import MCPClient
 from strands.multiagent.a2a import A2AServer
+from strands.multiagent.a2a.executor import StrandsA2AExecutor
 from urllib.parse import urlparse
 
 
 EMPLOYEE_INFO_URL = os.environ.get("EMPLOYEE_INFO_URL", "http://localhost:8002/mcp/")
 EMPLOYEE_AGENT_URL = os.environ.get("EMPLOYEE_AGENT_URL", "http://localhost:8001/")
+MAX_CONCURRENT_TASKS = int(os.environ.get("MAX_CONCURRENT_TASKS", "8"))
+MAX_WAITING_TASKS = int(os.environ.get("MAX_WAITING_TASKS", "32"))
+MAX_CONTEXTS = int(os.environ.get("MAX_CONTEXTS", "1000"))
+WORKERS = int(os.environ.get("WORKERS", "1"))
 
 employee_mcp_client = MCPClient(lambda: streamablehttp_client(EMPLOYEE_INFO_URL))
 
@@ -19,10 +34,14 @@ bedrock_model = BedrockModel(
     temperature=0.5,
 )
 
-with employee_mcp_client:
-    tools = employee_mcp_client.list_tools_sync()
+# kept open for the life of the process (in every worker), shared by all agents
+employee_mcp_client.start()
+atexit.register(employee_mcp_client.stop, None, None, None)
+# the stream_ tools send employees as log notifications, which strands drops
+tools = [tool for tool in employee_mcp_client.list_tools_sync() if not tool.tool_name.startswith("stream_")]
 
-    employee_agent = Agent(
+def create_agent() -> Agent:
+    return Agent(
         model=bedrock_model,
         name="Employee Agent",
         description="Answers questions about employees",
@@ -30,7 +49,76 @@ with employee_mcp_client:
         system_prompt="you must abbreviate employee first names and list all their skills"
     )
 
-    a2a_server = A2AServer(agent=employee_agent, host=urlparse(EMPLOYEE_AGENT_URL).hostname, port=urlparse(EMPLOYEE_AGENT_URL).port)
+class ContextAgentExecutor(AgentExecutor):
+    """runs every A2A task on an agent that belongs to the task's context, instead of one agent for all callers
 
-    if __name__ == "__main__":
+    concurrent callers therefore never share conversation history, and tasks of the same context run one at a
+    time. at most max_concurrent_tasks tasks run at once and max_waiting_tasks wait for a turn; beyond that
+    new tasks are rejected straight away so callers can back off. the least recently used contexts are
+    dropped beyond max_contexts, except contexts with tasks running or waiting on them."""
+    def __init__(self, agent_factory, max_concurrent_tasks: int, max_waiting_tasks: int, max_contexts: int):
+        self.agent_factory = agent_factory
+        self.max_waiting_tasks = max_waiting_tasks
+        self.max_contexts = max_contexts
+        self._running = asyncio.Semaphore(max_concurrent_tasks)
+        self._waiting = 0
+        self._contexts = OrderedDict()  # context id -> (agent, lock)
+        self._tasks = {}  # context id -> tasks running or waiting on the context
+
+    def _context(self, context_id: str) -> tuple[Agent, asyncio.Lock]:
+        """the context's agent and lock, marked busy until _release"""
+        if context_id in self._contexts:
+            self._contexts.move_to_end(context_id)
+        else:
+            self._contexts[context_id] = (self.agent_factory(), asyncio.Lock())
+        self._tasks[context_id] = self._tasks.get(context_id, 0) + 1
+        while len(self._contexts) > self.max_contexts:
+            # a busy context is never dropped, else its next task would get a second agent next to the running one
+            idle = next((idle_id for idle_id in self._contexts if idle_id not in self._tasks), None)
+            if idle is None:
+                break
+            del self._contexts[idle]
+        return self._contexts[context_id]
+
+    def _release(self, context_id: str) -> None:
+        self._tasks[context_id] -= 1
+        if not self._tasks[context_id]:
+            del self._tasks[context_id]
+
+    async def execute(self, context: RequestContext, event_queue: EventQueue) -> None:
+        if self._waiting >= self.max_waiting_tasks:
+            raise ServerError(error=InternalError(message="Employee agent is busy, try again later"))
+        self._waiting += 1
+        try:
+            await self._running.acquire()
+        finally:
+            self._waiting -= 1
+
+        context_id = context.context_id or context.task_id
+        try:
+            agent, lock = self._context(context_id)
+            try:
+                async with lock:
+                    await StrandsA2AExecutor(agent).execute(context, event_queue)
+            finally:
+                self._release(context_id)
+        finally:
+            self._running.release()
+
+    async def cancel(self, context: RequestContext, event_queue: EventQueue) -> None:
+        # what StrandsA2AExecutor.cancel does: strands agents cannot be cancelled mid-run
+        raise ServerError(error=UnsupportedOperationError())
+
+a2a_server = A2AServer(agent=create_agent(), host=urlparse(EMPLOYEE_AGENT_URL).hostname, port=urlparse(EMPLOYEE_AGENT_URL).port)
+a2a_server.request_handler = DefaultRequestHandler(
+    agent_executor=ContextAgentExecutor(create_agent, MAX_CONCURRENT_TASKS, MAX_WAITING_TASKS, MAX_CONTEXTS),
+    task_store=InMemoryTaskStore(),
+)
+app = a2a_server.to_starlette_app()
+
+if __name__ == "__main__":
+    if WORKERS > 1:
+        # each worker process imports this module and builds its own app, MCP client and contexts
+        uvicorn.run("agent:app", app_dir=os.path.dirname(os.path.abspath(__file__)), host="0.0.0.0", port=8001, workers=WORKERS)
+    else:
         a2a_server.serve(host="0.0.0.0", port=8001)
@@ -1,4 +1,15 @@
+import argparse
+import fcntl
+import json
+import mmap
+import os
 import random
+import time
+from array import array
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
 
 FIRST_NAMES = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "William", "Elizabeth"]
 LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez"]
@@ -10,10 +21,202 @@ SKILLS = {
     "Machine Learning", "DevOps", "Node.js", "REST API", "GraphQL"
 }
 
-EMPLOYEES = list({emp["name"]: emp for emp in [
-    {
-        "name": f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)}",
-        "skills": random.sample(list(SKILLS), random.randint(2, 5))
-    }
-    for i in range(100)
-]}.values())
+# bit order of the per-employee skill masks, sorted so the data never depends on set iteration order
+SKILL_COLUMNS = sorted(SKILLS)
+
+# every replica started with the same settings serves the same employees
+EMPLOYEE_COUNT = int(os.environ.get("EMPLOYEE_COUNT", "100"))
+EMPLOYEE_SEED = int(os.environ.get("EMPLOYEE_SEED", "42"))
+# when set, employees are generated once into this directory and memory-mapped on later starts
+EMPLOYEE_DATA_PATH = os.environ.get("EMPLOYEE_DATA_PATH")
+
+CHUNK_SIZE = 65536
+
+def generate_employee_columns(count: int, seed: int):
+    """deterministically generate employees as chunks of (first name ids, last name ids, skill masks) columns"""
+    rng = random.Random(seed)
+    skill_ids = range(len(SKILL_COLUMNS))
+    for start in range(0, count, CHUNK_SIZE):
+        first, last, skills = array("B"), array("B"), array("I")
+        for _ in range(min(CHUNK_SIZE, count - start)):
+            first.append(rng.randrange(len(FIRST_NAMES)))
+            last.append(rng.randrange(len(LAST_NAMES)))
+            mask = 0
+            for skill_id in rng.sample(skill_ids, rng.randint(2, 5)):
+                mask |= 1 << skill_id
+            skills.append(mask)
+        yield first, last, skills
+
+def build_skill_index(skill_masks, offset: int = 0) -> dict[str, array]:
+    """case-insensitive skill -> ascending employee positions, stored as compact unsigned int arrays"""
+    index = {skill.lower(): array("I") for skill in SKILL_COLUMNS}
+    postings = [index[skill.lower()] for skill in SKILL_COLUMNS]
+    for position, mask in enumerate(skill_masks, offset):
+        while mask:
+            lowest = mask & -mask
+            postings[lowest.bit_length() - 1].append(position)
+            mask ^= lowest
+    return index
+
+@lru_cache(maxsize=None)
+def _skills_for_mask(mask: int) -> tuple[str, ...]:
+    # bounded by the number of distinct 2-5 skill combinations
+    return tuple(skill for bit, skill in enumerate(SKILL_COLUMNS) if mask >> bit & 1)
+
+class EmployeeTable:
+    """read-only employees stored column-wise - a record dict is only built when an employee is read"""
+    def __init__(self, first, last, skills):
+        self.first = first
+        self.last = last
+        self.skills = skills
+
+    def __len__(self) -> int:
+        return len(self.skills)
+
+    def __getitem__(self, position: int) -> dict:
+        return {
+            "id": position,
+            "name": f"{FIRST_NAMES[self.first[position]]} {LAST_NAMES[self.last[position]]}",
+            "skills": list(_skills_for_mask(self.skills[position]))
+        }
+
+    def __iter__(self):
+        return (self[position] for position in range(len(self)))
+
+def generate_employees(count: int, seed: int) -> tuple[EmployeeTable, dict[str, array]]:
+    """generate employees and their skill index in memory"""
+    first, last, skills = array("B"), array("B"), array("I")
+    for first_chunk, last_chunk, skills_chunk in generate_employee_columns(count, seed):
+        first.extend(first_chunk)
+        last.extend(last_chunk)
+        skills.extend(skills_chunk)
+    return EmployeeTable(first, last, skills), build_skill_index(skills)
+
+def write_employee_data(path: str, count: int, seed: int):
+    """stream generated employees and their skill index to one flat file per column, without holding them in memory"""
+    directory = Path(path)
+    directory.mkdir(parents=True, exist_ok=True)
+    # unpublish an existing dataset before its files are truncated
+    (directory / "meta.json").unlink(missing_ok=True)
+    columns = {name: open(directory / name, "wb") for name in ["first.u8", "last.u8", "skills.u32"]}
+    postings = {skill: open(directory / f"skill-{bit}.u32", "wb") for bit, skill in enumerate(SKILL_COLUMNS)}
+    try:
+        offset = 0
+        for first, last, skills in generate_employee_columns(count, seed):
+            first.tofile(columns["first.u8"])
+            last.tofile(columns["last.u8"])
+            skills.tofile(columns["skills.u32"])
+            chunk_index = build_skill_index(skills, offset)
+            for skill, file in postings.items():
+                chunk_index[skill.lower()].tofile(file)
+            offset += len(skills)
+    finally:
+        for file in [*columns.values(), *postings.values()]:
+            file.close()
+
+    # published last and atomically, so a directory without meta.json is an incomplete dataset
+    meta = {"count": count, "seed": seed, "first_names": FIRST_NAMES, "last_names": LAST_NAMES, "skills": SKILL_COLUMNS}
+    (directory / "meta.json.tmp").write_text(json.dumps(meta))
+    os.replace(directory / "meta.json.tmp", directory / "meta.json")
+
+@contextmanager
+def employee_data_lock(path: str):
+    """exclusive lock on a dataset directory, so replicas sharing it never write it at the same time"""
+    directory = Path(path)
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield  # released when the lock file is closed
+
+def ensure_employee_data(path: str, count: int, seed: int):
+    """write the dataset unless it has been published - the first replica to start writes it, the others wait and reuse it"""
+    with employee_data_lock(path):
+        if not (Path(path) / "meta.json").exists():
+            write_employee_data(path, count, seed)
+
+def _map_column(file_path: Path, typecode: str):
+    if file_path.stat().st_size == 0:
+        # mmap cannot map empty files
+        return array(typecode)
+    with open(file_path, "rb") as file:
+        return memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)).cast(typecode)
+
+def load_employee_data(path: str, count: int, seed: int) -> tuple[EmployeeTable, dict[str, array]]:
+    """memory-map a dataset written by write_employee_data - pages are only read from disk when used"""
+    directory = Path(path)
+    meta = json.loads((directory / "meta.json").read_text())
+    if (meta["first_names"], meta["last_names"], meta["skills"]) != (FIRST_NAMES, LAST_NAMES, SKILL_COLUMNS):
+        raise ValueError(f"Employee data in {path} was generated with different names or skills")
+    # never regenerated in place: replicas sharing the directory would serve different data while it is rewritten
+    if (meta["count"], meta["seed"]) != (count, seed):
+        raise ValueError(f"Employee data in {path} has {meta['count']} employees from seed {meta['seed']}, "
+                         f"but EMPLOYEE_COUNT={count} and EMPLOYEE_SEED={seed} - set them to match or use a new directory")
+
+    employees = EmployeeTable(
+        _map_column(directory / "first.u8", "B"),
+        _map_column(directory / "last.u8", "B"),
+        _map_column(directory / "skills.u32", "I")
+    )
+    index = {skill.lower(): _map_column(directory / f"skill-{bit}.u32", "I") for bit, skill in enumerate(SKILL_COLUMNS)}
+    return employees, index
+
+if EMPLOYEE_DATA_PATH:
+    ensure_employee_data(EMPLOYEE_DATA_PATH, EMPLOYEE_COUNT, EMPLOYEE_SEED)
+    EMPLOYEES, SKILL_INDEX = load_employee_data(EMPLOYEE_DATA_PATH, EMPLOYEE_COUNT, EMPLOYEE_SEED)
+else:
+    EMPLOYEES, SKILL_INDEX = generate_employees(EMPLOYEE_COUNT, EMPLOYEE_SEED)
+
+EMPLOYEE_FIELDS = ["id", "name", "skills"]
+
+def skill_positions(skills: list[str], match_all: bool = True, index: dict[str, array] = SKILL_INDEX):
+    """ascending positions of employees having all (AND) or any (OR) of the skills, answered from the skill index"""
+    postings = sorted((index.get(skill.lower(), array("I")) for skill in skills), key=len)
+    if not postings:
+        return []
+    if len(postings) == 1:
+        # a posting list is already in ascending order
+        return postings[0]
+    if match_all:
+        # start from the rarest skill so the intersection stays small
+        positions = set(postings[0])
+        for posting in postings[1:]:
+            positions.intersection_update(posting)
+    else:
+        positions = set().union(*postings)
+    return sorted(positions)
+
+def employees_with_skills(skills: list[str], match_all: bool = True, employees: EmployeeTable = EMPLOYEES, index: dict[str, array] = SKILL_INDEX) -> list[dict]:
+    """employees having all (AND) or any (OR) of the skills"""
+    return [employees[position] for position in skill_positions(skills, match_all, index)]
+
+def employee_page(skills: list[str], match_all: bool = True, cursor: str | None = None, limit: int = 100, fields: list[str] | None = None,
+                  employees: EmployeeTable = EMPLOYEES, index: dict[str, array] = SKILL_INDEX) -> tuple[list[dict], str | None]:
+    """one page of employees_with_skills, plus the cursor of the next page (None on the last page)"""
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    if fields and not set(fields) <= set(EMPLOYEE_FIELDS):
+        raise ValueError(f"fields must be chosen from {EMPLOYEE_FIELDS}")
+
+    positions = skill_positions(skills, match_all, index)
+    # the cursor is the id of the first employee of the page, found by binary search in the ascending positions
+    start = bisect_left(positions, int(cursor)) if cursor else 0
+    end = start + limit
+    next_cursor = str(positions[end]) if end < len(positions) else None
+
+    records = [employees[position] for position in positions[start:end]]
+    if fields:
+        records = [{field: record[field] for field in fields} for record in records]
+    return records, next_cursor
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="generate an employee dataset for EMPLOYEE_DATA_PATH")
+    parser.add_argument("path")
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=EMPLOYEE_SEED)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with employee_data_lock(args.path):
+        write_employee_data(args.path, args.count, args.seed)
+    size = sum(file.stat().st_size for file in Path(args.path).iterdir())
+    print(f"wrote {args.count} employees to {args.path} ({size / 1024 / 1024:.1f}MiB) in {time.perf_counter() - start:.1f}s")
@@ -1,7 +1,13 @@
+import asyncio
+import atexit
 import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any
 
 import uvicorn
-from strands import Agent
+from strands import Agent, tool
 from strands.models import BedrockModel
 from strands_tools.a2a_client import A2AClientToolProvider
 from fastapi import FastAPI
@@ -9,34 +15,131 @@ from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 EMPLOYEE_AGENT_URL = os.environ.get("EMPLOYEE_AGENT_URL", "http://localhost:8001/")
-
-app = FastAPI(title="HR Agent API")
+AGENT_CARD_TTL = float(os.environ.get("AGENT_CARD_TTL", "300"))
+MAX_CONCURRENT_INQUIRIES = int(os.environ.get("MAX_CONCURRENT_INQUIRIES", "16"))
 
 class QuestionRequest(BaseModel):
     question: str
 
-@app.get("/health")
-def health_check():
-    return {"status": "healthy"}
-
 bedrock_model = BedrockModel(
     model_id="amazon.nova-micro-v1:0",
     region_name="us-east-1",
     temperature=0.5,
 )
 
+class ThreadA2ATools:
+    """A2A delegation tools backed by one A2AClientToolProvider per worker thread instead of one per request
+
+    strands runs these sync tools in worker threads, and the provider drives its httpx.AsyncClient with the
+    calling thread's event loop, so a provider must never be shared between threads. within a thread it is
+    kept, with its cached agent card and keep-alive connections, so delegation only costs the task exchange.
+    after card_ttl seconds it is closed and replaced, so changes to the employee agent's card are picked up.
+    close() closes the providers still in use, each on its own event loop."""
+    def __init__(self, known_agent_urls: list[str], card_ttl: float):
+        self.known_agent_urls = known_agent_urls
+        self.card_ttl = card_ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._providers = {}  # live provider -> the event loop its client belongs to
+
+    def _provider(self) -> A2AClientToolProvider:
+        local = self._local
+        provider = getattr(local, "provider", None)
+        if provider is not None and time.monotonic() - local.created_at > self.card_ttl:
+            # closed on the thread, and so the event loop, that its client belongs to
+            provider.close()
+            with self._lock:
+                del self._providers[provider]
+            provider = None
+        if provider is None:
+            provider = local.provider = A2AClientToolProvider(known_agent_urls=self.known_agent_urls)
+            local.created_at = time.monotonic()
+            # the provider registers close() with atexit, which would keep every replaced provider alive and close
+            # the live ones on the main thread's event loop; close() below takes care of them instead
+            atexit.unregister(provider.close)
+            # the loop the provider will run its client on, found the same way it does
+            try:
+                loop = asyncio.get_event_loop()
+            except RuntimeError:
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+            with self._lock:
+                self._providers[provider] = loop
+        return provider
+
+    def close(self):
+        """close the live providers - from a new thread, since a thread can only run one event loop at a time"""
+        with self._lock:
+            providers, self._providers = self._providers, {}
+
+        def close_providers():
+            for provider, loop in providers.items():
+                asyncio.set_event_loop(loop)
+                provider.close()
+
+        thread = threading.Thread(target=close_providers)
+        thread.start()
+        thread.join()
+
+    @property
+    def tools(self):
+        return [self.a2a_discover_agent, self.a2a_list_discovered_agents, self.a2a_send_message]
+
+    @tool
+    def a2a_discover_agent(self, url: str) -> dict[str, Any]:
+        """
+        Discover an A2A agent and return its agent card with capabilities.
+
+        Args:
+            url: The base URL of the A2A agent to discover
+        """
+        return self._provider().a2a_discover_agent(url)
+
+    @tool
+    def a2a_list_discovered_agents(self) -> dict[str, Any]:
+        """
+        List all discovered A2A agents and their capabilities.
+        """
+        return self._provider().a2a_list_discovered_agents()
+
+    @tool
+    def a2a_send_message(self, message_text: str, target_agent_url: str, message_id: str | None = None) -> dict[str, Any]:
+        """
+        Send a message to a specific A2A agent and return the response.
+
+        Args:
+            message_text: The message content to send to the agent
+            target_agent_url: The URL of the target A2A agent
+            message_id: Optional message ID for tracking (generates UUID if not provided)
+        """
+        return self._provider().a2a_send_message(message_text, target_agent_url, message_id)
+
+a2a_tools = ThreadA2ATools([EMPLOYEE_AGENT_URL], AGENT_CARD_TTL)
+# bounds the agent runs, and so the A2A delegations, in flight at once; later requests wait their turn
+inquiry_slots = asyncio.Semaphore(MAX_CONCURRENT_INQUIRIES)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await asyncio.to_thread(a2a_tools.close)
+
+app = FastAPI(title="HR Agent API", lifespan=lifespan)
+
+@app.get("/health")
+def health_check():
+    return {"status": "healthy"}
+
 @app.post("/inquire")
 async def ask_agent(request: QuestionRequest):
     async def generate():
-        provider = A2AClientToolProvider(known_agent_urls=[EMPLOYEE_AGENT_URL])
-
-        agent = Agent(model=bedrock_model, tools=provider.tools)
+        async with inquiry_slots:
+            agent = Agent(model=bedrock_model, tools=a2a_tools.tools)
 
-        stream_response = agent.stream_async(request.question)
+            stream_response = agent.stream_async(request.question)
 
-        async for event in stream_response:
-            if "data" in event:
-                yield event["data"]
+            async for event in stream_response:
+                if "data" in event:
+                    yield event["data"]
 
     return StreamingResponse(
         generate(),
@@ -2,11 +2,16 @@ import os
 from mcp.client.streamable_http import streamablehttp_client
 from mcp.server.fastmcp import FastMCP
 from strands import Agent
-from strands.tools.mcp.mcp_client import MCPClient
 from strands.models import BedrockModel
 
+from mcp_client_pool import MCPClientPool
+
 EMPLOYEE_INFO_URL = os.environ.get("EMPLOYEE_INFO_URL", "http://localhost:8002/mcp/")
-employee_mcp_client = MCPClient(lambda: streamablehttp_client(EMPLOYEE_INFO_URL))
+# sessions and tool lists are kept across questions, so each question only pays for its tool calls
+employee_mcp_pool = MCPClientPool(
+    lambda: streamablehttp_client(EMPLOYEE_INFO_URL),
+    size=int(os.environ.get("EMPLOYEE_MCP_POOL_SIZE", "4")),
+)
 
 bedrock_model = BedrockModel(
     model_id="amazon.nova-micro-v1:0",
@@ -14,9 +19,9 @@ bedrock_model = BedrockModel(
 )
 
 def employee_agent(question: str):
-    with employee_mcp_client:
-        tools = employee_mcp_client.list_tools_sync()
-
+    with employee_mcp_pool.tools() as tools:
+        # the stream_ tools send employees as log notifications, which strands drops
+        tools = [tool for tool in tools if not tool.tool_name.startswith("stream_")]
         agent = Agent(model=bedrock_model, tools=tools, system_prompt="you must abbreviate employee first names and list all their skills", callback_handler=None)
 
         return agent(question)
@@ -0,0 +1,54 @@
+"""
+measures the per-question MCP overhead of the employee agent against a running employee server,
+without calling Bedrock: each simulated question makes one get_skills tool call
+
+    uv run employee-agent/load_test.py --questions 200 --concurrency 8
+"""
+import argparse
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from mcp.client.streamable_http import streamablehttp_client
+from strands.tools.mcp.mcp_client import MCPClient
+
+from mcp_client_pool import MCPClientPool
+
+EMPLOYEE_INFO_URL = os.environ.get("EMPLOYEE_INFO_URL", "http://localhost:8002/mcp/")
+
+def call_get_skills(tools):
+    get_skills = next(tool for tool in tools if tool.tool_name == "get_skills")
+    get_skills.mcp_client.call_tool_sync(str(uuid.uuid4()), "get_skills", {})
+
+def per_question_client():
+    # what employee_agent() used to do: connect, initialize and list tools for every question
+    client = MCPClient(lambda: streamablehttp_client(EMPLOYEE_INFO_URL))
+    with client:
+        call_get_skills(client.list_tools_sync())
+
+def run(label: str, question, questions: int, concurrency: int):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda _: question(), range(questions)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<20} {elapsed:6.2f}s  {questions / elapsed:7.1f} questions/s  {elapsed / questions * 1000:6.1f}ms/question")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    run("client per question", per_question_client, args.questions, args.concurrency)
+    print(f"{'':<20} {args.questions} connects, {args.questions} tool listings")
+
+    pool = MCPClientPool(lambda: streamablehttp_client(EMPLOYEE_INFO_URL), size=args.concurrency)
+
+    def pooled():
+        with pool.tools() as tools:
+            call_get_skills(tools)
+
+    run("pooled clients", pooled, args.questions, args.concurrency)
+    print(f"{'':<20} {pool.connects} connects, {pool.tool_listings} tool listings")
+    pool.close()
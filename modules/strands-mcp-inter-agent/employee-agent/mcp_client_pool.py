@@ -0,0 +1,136 @@
+# the employee agent and the HR agent each carry an identical copy of this module: every service directory
+# runs as its own script (e.g. python hr-agent/agent.py) with only that directory on the import path
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+from strands.tools.mcp.mcp_client import MCPClient
+
+
+class MCPClientPool:
+    """long-lived strands MCPClients that are shared across requests instead of connecting per request
+
+    every pooled client keeps its session open and caches its tool list (the tools are bound to the client
+    that listed them). a background thread health-checks idle clients by re-listing their tools, which also
+    refreshes the cache off the request path, and reconnects clients that fail."""
+
+    def __init__(self, transport: Callable, size: int = 4, tools_ttl: float = 300, health_check_interval: float = 30):
+        self.transport = transport
+        self.size = size
+        self.tools_ttl = tools_ttl
+        self.health_check_interval = health_check_interval
+        # slots are [client, tools, listed_at]; client is None until the slot is first used or after a failure
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._idle.put([None, None, 0.0])
+        self.connects = 0
+        self.tool_listings = 0
+        self._health_checker = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def tools(self, timeout: float | None = None):
+        """borrow a connected client's cached tool list for the duration of one request"""
+        slot = self.acquire(timeout)
+        failed = False
+        try:
+            yield slot[1]
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.release(slot, failed)
+
+    def acquire(self, timeout: float | None = None) -> list:
+        """take a slot with a connected client and current tools (slot[1]) - blocks, so call it off the event loop"""
+        self._start_health_checker()
+        slot = self._idle.get(timeout=timeout)
+        try:
+            self._ensure_ready(slot)
+        except Exception:
+            self._check(slot)
+            self._idle.put(slot)
+            raise
+        return slot
+
+    def release(self, slot: list, failed: bool = False):
+        """return a slot; the failure may have come from the model rather than MCP, so only reconnect if the session is unhealthy"""
+        if failed:
+            self._check(slot)
+        self._idle.put(slot)
+
+    def warm_up(self):
+        """connect every slot and list its tools ahead of the first request"""
+        slots = [self._idle.get() for _ in range(self.size)]
+        try:
+            for slot in slots:
+                self._ensure_ready(slot)
+        finally:
+            for slot in slots:
+                self._idle.put(slot)
+        self._start_health_checker()
+
+    def close(self):
+        while not self._idle.empty():
+            self._disconnect(self._idle.get_nowait())
+
+    def _ensure_ready(self, slot: list):
+        if slot[0] is None:
+            client = MCPClient(self.transport)
+            client.start()
+            slot[0] = client
+            slot[1] = None
+            self.connects += 1
+        if slot[1] is None or time.monotonic() - slot[2] > self.tools_ttl:
+            self._list_tools(slot)
+
+    def _list_tools(self, slot: list):
+        slot[1] = slot[0].list_tools_sync()
+        slot[2] = time.monotonic()
+        self.tool_listings += 1
+
+    def _check(self, slot: list):
+        """re-list tools as a health check, dropping the session if that fails"""
+        if slot[0] is None:
+            return
+        try:
+            self._list_tools(slot)
+        except Exception as e:
+            print(f"MCP client health check failed, reconnecting: {e}")
+            self._disconnect(slot)
+
+    def _disconnect(self, slot: list):
+        client = slot[0]
+        slot[:] = [None, None, 0.0]
+        if client is not None:
+            try:
+                client.stop(None, None, None)
+            except Exception as e:
+                print(f"Error stopping MCP client: {e}")
+
+    def _start_health_checker(self):
+        with self._lock:
+            if self._health_checker is None:
+                self._health_checker = threading.Thread(target=self._health_check_loop, daemon=True)
+                self._health_checker.start()
+
+    def _health_check_loop(self):
+        while True:
+            time.sleep(self.health_check_interval)
+            # only idle slots are checked, so requests never wait on a health check
+            for _ in range(self.size):
+                try:
+                    slot = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    if slot[0] is not None:
+                        self._check(slot)
+                    if slot[0] is None:
+                        self._ensure_ready(slot)
+                except Exception as e:
+                    print(f"MCP client reconnect failed: {e}")
+                finally:
+                    self._idle.put(slot)
@@ -0,0 +1,34 @@
+"""
+compares the original linear scan in get_employees_with_skill with the skill index
+
+    uv run employee-server/benchmark_skill_index.py 100000 1000000
+"""
+import sys
+import time
+
+from employee_data import build_skill_index, employees_with_skills, generate_employees
+
+def scan(employees: list[dict], skill: str) -> list[dict]:
+    skill_lower = skill.lower()
+    return [employee for employee in employees if any(s.lower() == skill_lower for s in employee["skills"])]
+
+def timed(fn, repeat: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+if __name__ == "__main__":
+    for count in [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]:
+        table, _ = generate_employees(count, seed=42)
+        employees = list(table)
+        start = time.perf_counter()
+        index = build_skill_index(table.skills)
+        build_ms = (time.perf_counter() - start) * 1000
+        index_kb = sum(posting.buffer_info()[1] * posting.itemsize for posting in index.values()) / 1024
+
+        print(f"{count} employees: index built in {build_ms:.0f}ms, postings {index_kb:.0f}KiB")
+        print(f"  scan  python          {timed(lambda: scan(employees, 'python')):8.2f}ms")
+        print(f"  index python          {timed(lambda: employees_with_skills(['python'], True, table, index)):8.2f}ms")
+        print(f"  index python AND aws  {timed(lambda: employees_with_skills(['python', 'aws'], True, table, index)):8.2f}ms")
+        print(f"  index python OR aws   {timed(lambda: employees_with_skills(['python', 'aws'], False, table, index)):8.2f}ms")
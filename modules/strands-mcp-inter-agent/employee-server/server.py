@@ -1,9 +1,30 @@
-from employee_data import SKILLS, EMPLOYEES
+import json
 
-from mcp.server.fastmcp import FastMCP
+from employee_data import SKILLS, employee_page
+
+from mcp.server.fastmcp import Context, FastMCP
 
 mcp = FastMCP("employee-server", stateless_http=True, host="0.0.0.0", port=8002)
 
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 20
+
+def skill_page(skill: str, cursor: str | None, limit: int, fields: list[str] | None) -> tuple[list[dict], str | None]:
+    employees, next_cursor = employee_page([skill], True, cursor, min(limit, MAX_PAGE_SIZE), fields)
+    return employees, next_cursor
+
+def skills_page(skills: list[str], match_all: bool, cursor: str | None, limit: int, fields: list[str] | None) -> tuple[list[dict], str | None]:
+    employees, next_cursor = employee_page(skills, match_all, cursor, min(limit, MAX_PAGE_SIZE), fields)
+    return employees, next_cursor
+
+async def stream_page(employees: list[dict], next_cursor: str | None, ctx: Context) -> dict:
+    # send the page in chunks as log notifications on the request's event stream, keeping the final result small
+    for start in range(0, len(employees), STREAM_CHUNK_SIZE):
+        await ctx.info(json.dumps(employees[start:start + STREAM_CHUNK_SIZE]))
+        await ctx.report_progress(min(start + STREAM_CHUNK_SIZE, len(employees)), len(employees))
+    return {"streamed": len(employees), "next_cursor": next_cursor}
+
 @mcp.tool()
 def get_skills() -> set[str]:
     """all of the skills that employees may have - use this list to figure out related skills"""
@@ -11,11 +32,39 @@ def get_skills() -> set[str]:
     return SKILLS
 
 @mcp.tool()
-def get_employees_with_skill(skill: str) -> list[dict]:
-    """employees that have a specified skill - output includes fullname (First Last) and their skills"""
-    print(f"get_employees_with_skill({skill})")
-    skill_lower = skill.lower()
-    return [employee for employee in EMPLOYEES if any(s.lower() == skill_lower for s in employee["skills"])]
+def get_employees_with_skill(skill: str, cursor: str | None = None, limit: int = PAGE_SIZE, fields: list[str] | None = None) -> dict:
+    """employees that have a specified skill - output includes fullname (First Last) and their skills.
+    results are paged: when next_cursor is set, call again with it as cursor for more. limit is capped at 1000.
+    fields limits each employee to some of id, name and skills, e.g. ["name"] for names only."""
+    print(f"get_employees_with_skill({skill}, cursor={cursor}, limit={limit}, fields={fields})")
+    employees, next_cursor = skill_page(skill, cursor, limit, fields)
+    return {"employees": employees, "next_cursor": next_cursor}
+
+@mcp.tool()
+def get_employees_with_skills(skills: list[str], match_all: bool = True, cursor: str | None = None, limit: int = PAGE_SIZE, fields: list[str] | None = None) -> dict:
+    """employees that have all of the specified skills (match_all=true) or any of them (match_all=false) - output includes fullname (First Last) and their skills.
+    paging and fields work as in get_employees_with_skill"""
+    print(f"get_employees_with_skills({skills}, match_all={match_all}, cursor={cursor}, limit={limit}, fields={fields})")
+    employees, next_cursor = skills_page(skills, match_all, cursor, limit, fields)
+    return {"employees": employees, "next_cursor": next_cursor}
+
+# the stream_ tools are for MCP clients that read log notifications - the employee agents leave them out,
+# since strands drops log notifications and the model would never see the employees
+
+@mcp.tool()
+async def stream_employees_with_skill(skill: str, cursor: str | None = None, limit: int = PAGE_SIZE, fields: list[str] | None = None, ctx: Context = None) -> dict:
+    """get_employees_with_skill, but the employees are sent as log notifications holding JSON lists of up to 20,
+    and the result only holds their number (streamed) and next_cursor"""
+    print(f"stream_employees_with_skill({skill}, cursor={cursor}, limit={limit}, fields={fields})")
+    employees, next_cursor = skill_page(skill, cursor, limit, fields)
+    return await stream_page(employees, next_cursor, ctx)
+
+@mcp.tool()
+async def stream_employees_with_skills(skills: list[str], match_all: bool = True, cursor: str | None = None, limit: int = PAGE_SIZE, fields: list[str] | None = None, ctx: Context = None) -> dict:
+    """get_employees_with_skills, streamed as in stream_employees_with_skill"""
+    print(f"stream_employees_with_skills({skills}, match_all={match_all}, cursor={cursor}, limit={limit}, fields={fields})")
+    employees, next_cursor = skills_page(skills, match_all, cursor, limit, fields)
+    return await stream_page(employees, next_cursor, ctx)
 
 if __name__ == "__main__":
     mcp.run(transport="streamable-http")
@@ -1,22 +1,48 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 from mcp.client.streamable_http import streamablehttp_client
 from strands import Agent
-from strands.tools.mcp.mcp_client import MCPClient
 from strands.models import BedrockModel
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 import uvicorn
 
+from mcp_client_pool import MCPClientPool
+
 EMPLOYEE_AGENT_URL = os.environ.get("EMPLOYEE_AGENT_URL", "http://localhost:8001/mcp/")
-hr_mcp_client = MCPClient(lambda: streamablehttp_client(EMPLOYEE_AGENT_URL))
+# sessions and tool lists are set up once and shared, keeping connection and discovery out of /inquire
+hr_mcp_pool = MCPClientPool(
+    lambda: streamablehttp_client(EMPLOYEE_AGENT_URL),
+    size=int(os.environ.get("HR_MCP_POOL_SIZE", "8")),
+)
+# one permit per pooled session: a request only takes a worker thread for acquire once a session is free for it,
+# so waiting requests can never occupy every thread of the loop's executor
+hr_mcp_slots = asyncio.Semaphore(hr_mcp_pool.size)
+HR_MCP_POOL_TIMEOUT = float(os.environ.get("HR_MCP_POOL_TIMEOUT", "30"))
 
 bedrock_model = BedrockModel(
     model_id="amazon.nova-micro-v1:0",
     region_name="us-east-1",
 )
 
-app = FastAPI(title="HR Agent API")
+def create_agent(tools) -> Agent:
+    """a fresh agent per request, so conversations never share history"""
+    return Agent(model=bedrock_model, tools=tools) #, callback_handler=None)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # the pool's calls block, so they run in threads rather than on the event loop
+    try:
+        await asyncio.to_thread(hr_mcp_pool.warm_up)
+    except Exception as e:
+        print(f"Could not connect to the employee agent yet, connecting on first request: {e}")
+    yield
+    await asyncio.to_thread(hr_mcp_pool.close)
+
+app = FastAPI(title="HR Agent API", lifespan=lifespan)
 
 class QuestionRequest(BaseModel):
     question: str
@@ -27,17 +53,48 @@ def health_check():
 
 @app.post("/inquire")
 async def ask_agent(request: QuestionRequest):
+    try:
+        await asyncio.wait_for(hr_mcp_slots.acquire(), timeout=HR_MCP_POOL_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="All employee agent sessions are busy", headers={"Retry-After": "1"})
+    try:
+        slot = await asyncio.to_thread(hr_mcp_pool.acquire)
+    except Exception:
+        hr_mcp_slots.release()
+        raise
+
+    released = False
+    async def release(failed: bool = False):
+        nonlocal released
+        if released:
+            return
+        released = True
+        if failed:
+            # the health check blocks on the session, so it runs in a thread
+            await asyncio.to_thread(hr_mcp_pool.release, slot, True)
+        else:
+            # putting back on the unbounded idle queue never blocks
+            hr_mcp_pool.release(slot)
+        hr_mcp_slots.release()
+
     async def generate():
-        with hr_mcp_client:
-            tools = hr_mcp_client.list_tools_sync()
-            agent = Agent(model=bedrock_model, tools=tools) #, callback_handler=None)
+        failed = False
+        try:
+            agent = create_agent(slot[1])
             async for event in agent.stream_async(request.question):
                 if "data" in event:
                     yield event["data"]
+        except Exception:
+            failed = True
+            raise
+        finally:
+            await release(failed)
 
+    # the background task returns the session if the response is abandoned before generate() starts
     return StreamingResponse(
         generate(),
-        media_type="text/plain"
+        media_type="text/plain",
+        background=BackgroundTask(release)
     )
 
 
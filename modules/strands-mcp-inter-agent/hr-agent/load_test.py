@@ -0,0 +1,53 @@
+"""
+measures time-to-first-byte and total time of concurrent /inquire requests against a running HR agent
+
+    uv run hr-agent/load_test.py --requests 32 --concurrency 8
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+HR_AGENT_URL = os.environ.get("HR_AGENT_URL", "http://localhost:8000")
+
+async def inquire(client: httpx.AsyncClient, question: str) -> tuple[float, float]:
+    start = time.perf_counter()
+    first_byte = None
+    async with client.stream("POST", f"{HR_AGENT_URL}/inquire", json={"question": question}) as response:
+        response.raise_for_status()
+        async for _ in response.aiter_bytes():
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+    return first_byte or 0.0, time.perf_counter() - start
+
+def percentile(values: list[float], fraction: float) -> float:
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))]
+
+async def main(requests: int, concurrency: int, question: str):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited():
+        async with semaphore:
+            return await inquire(client, question)
+
+    async with httpx.AsyncClient(timeout=None) as client:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(limited() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    ttfb = [first_byte * 1000 for first_byte, _ in results]
+    total = [duration * 1000 for _, duration in results]
+    print(f"{requests} requests, concurrency {concurrency}, {requests / elapsed:.2f} requests/s")
+    print(f"  time to first byte  p50 {statistics.median(ttfb):8.0f}ms  p95 {percentile(ttfb, 0.95):8.0f}ms  max {max(ttfb):8.0f}ms")
+    print(f"  total               p50 {statistics.median(total):8.0f}ms  p95 {percentile(total, 0.95):8.0f}ms  max {max(total):8.0f}ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--question", default="list employees that have skills related to AI programming")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.question))